@@ -1,27 +1,63 @@
 from django.contrib import admin
 
-from main.models import Module, Section, Topic
+from main.models import Module, Section, Topic, Payment, TopicProgress
+from main.paginators import EstimatedCountPaginator
+
+
+class ContentAdmin(admin.ModelAdmin):
+    """Базовый класс админки больших таблиц: связанные объекты загружаются тем же запросом через JOIN,
+    количество строк без фильтров оценивается по статистике, а полный COUNT(*) при поиске не выполняется"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
 
 
 @admin.register(Module)
-class ModuleAdmin(admin.ModelAdmin):
+class ModuleAdmin(ContentAdmin):
     """Класс ModuleAdmin для отображения, фильтрации и поиска модели Module"""
-    list_display = ('user', 'number', 'title', 'description')
-    list_filter = ('title', 'user',)
-    search_fields = ('user',)
+    list_display = ('id', 'number', 'title', 'user', 'is_paid', 'section_count', 'topic_count', 'learner_count')
+    list_select_related = ('user',)
+    list_filter = ('is_paid',)
+    search_fields = ('title',)
+    autocomplete_fields = ('user',)
 
 
 @admin.register(Section)
-class ModuleSection(admin.ModelAdmin):
+class ModuleSection(ContentAdmin):
     """Класс ModuleSection для отображения, фильтрации и поиска модели Section"""
-    list_display = ('module', 'number', 'title', 'description')
-    list_filter = ('title', 'module',)
-    search_fields = ('module',)
+    list_display = ('id', 'number', 'title', 'module')
+    list_select_related = ('module',)
+    search_fields = ('title',)
+    autocomplete_fields = ('module',)
 
 
 @admin.register(Topic)
-class ModuleTopic(admin.ModelAdmin):
+class ModuleTopic(ContentAdmin):
     """Класс ModuleTopic для отображения, фильтрации и поиска модели Topic"""
-    list_display = ('section', 'number', 'title', 'description')
-    list_filter = ('title', 'section',)
-    search_fields = ('section',)
+    list_display = ('id', 'number', 'title', 'section', 'module')
+    list_select_related = ('section', 'module')
+    search_fields = ('title',)
+    autocomplete_fields = ('section',)
+
+
+@admin.register(Payment)
+class PaymentAdmin(ContentAdmin):
+    """Класс PaymentAdmin для отображения, фильтрации и поиска модели Payment. Поиск выполняется
+    по точному совпадению с уникальными полями пользователя, поэтому использует индексы"""
+    list_display = ('id', 'user', 'module', 'amount', 'status', 'payment_date')
+    list_select_related = ('user', 'module')
+    list_filter = ('status',)
+    search_fields = ('=user__username', '=user__email', '=idempotency_key')
+    autocomplete_fields = ('user', 'module')
+    readonly_fields = ('payment_date',)
+    ordering = ('-id',)
+
+
+@admin.register(TopicProgress)
+class TopicProgressAdmin(ContentAdmin):
+    """Класс TopicProgressAdmin для отображения и поиска прогресса пользователей по темам"""
+    list_display = ('id', 'user', 'topic', 'position', 'time_spent', 'completed_at', 'last_seen_at')
+    list_select_related = ('user', 'topic')
+    search_fields = ('=user__username', '=user__email')
+    autocomplete_fields = ('user', 'topic')
+    ordering = ('-id',)
@@ -0,0 +1,137 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from users.authentication import CachedJWTAuthentication
+
+from .entitlements import get_paid_module_ids
+from .models import Module, Section, Topic
+from .paginators import ContentCursorPagination
+from .serializers import ModuleSerializer, SectionSerializer, TopicSerializer, ValuesSerializer
+
+# Асинхронные представления для чтения модулей, разделов и тем. Они не используют DRF и рассчитаны
+# на запуск под ASGI (uvicorn): запросы к базе данных выполняются через асинхронный ORM и не занимают
+# поток на время ожидания ответа базы данных
+
+_authentication = CachedJWTAuthentication()
+
+
+async def _authenticate(request):
+    """Возвращает пользователя по JWT из заголовка Authorization или None"""
+    try:
+        result = await sync_to_async(_authentication.authenticate)(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return result[0] if result else None
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def _unauthorized():
+    return _json({'detail': 'Учетные данные не были предоставлены.'}, status=401)
+
+
+def _not_found():
+    return _json({'detail': 'Страница не найдена.'}, status=404)
+
+
+async def _page(request, queryset, serializer_class):
+    """Возвращает страницу списка с теми же параметрами (cursor, page_size) и в том же виде (next, previous,
+    results), что и синхронные списки: страница выбирается классом ContentCursorPagination. Асинхронный ORM
+    Django сам выполняет запросы в потоке через sync_to_async, поэтому выборка страницы выполняется так же"""
+    paginator = ContentCursorPagination()
+    values_serializer = ValuesSerializer.for_serializer(serializer_class)
+    try:
+        rows = await sync_to_async(paginator.paginate_queryset)(values_serializer.values(queryset), Request(request))
+    except NotFound as exc:
+        return _json({'detail': str(exc.detail)}, status=404)
+    return _json(paginator.get_paginated_response(values_serializer.to_representation(rows)).data)
+
+
+async def _detail(queryset, serializer_class, pk):
+    values_serializer = ValuesSerializer.for_serializer(serializer_class)
+    try:
+        row = await values_serializer.values(queryset).aget(pk=pk)
+    except queryset.model.DoesNotExist:
+        return _not_found()
+    return _json(values_serializer.to_representation([row])[0])
+
+
+async def module_list(request):
+    return await _page(request, Module.objects.all(), ModuleSerializer)
+
+
+async def module_detail(request, pk):
+    user = await _authenticate(request)
+    paid_module_ids = await sync_to_async(get_paid_module_ids)(user)
+    if pk not in paid_module_ids:
+        if not await Module.objects.filter(pk=pk).aexists():
+            return _not_found()
+        return _json({'detail': 'You are not allowed to view this module in detail.'}, status=403)
+    return await _detail(Module.objects.all(), ModuleSerializer, pk)
+
+
+async def module_tree(request, pk):
+    """Дерево модуля загружается тремя запросами: модуль, его разделы и темы этих разделов"""
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthorized()
+    paid_module_ids = await sync_to_async(get_paid_module_ids)(user)
+    module_serializer = ValuesSerializer.for_serializer(ModuleSerializer)
+    section_serializer = ValuesSerializer.for_serializer(SectionSerializer)
+    topic_serializer = ValuesSerializer.for_serializer(TopicSerializer)
+
+    accessible = Module.objects.filter(Q(is_paid=True) | Q(id__in=paid_module_ids), pk=pk)
+    try:
+        module = await module_serializer.values(accessible).aget()
+    except Module.DoesNotExist:
+        return _not_found()
+    sections = [row async for row in section_serializer.values(
+        Section.objects.filter(module_id=pk).order_by('number', 'id')).aiterator()]
+    topics = [row async for row in topic_serializer.values(
+        Topic.objects.filter(module_id=pk).order_by('number', 'id')).aiterator()]
+
+    topics_by_section = {}
+    for topic in topic_serializer.to_representation(topics):
+        topics_by_section.setdefault(topic['section'], []).append(topic)
+    data = module_serializer.to_representation([module])[0]
+    data['sections'] = [dict(section, topics=topics_by_section.get(section['id'], []))
+                        for section in section_serializer.to_representation(sections)]
+    return _json(data)
+
+
+async def section_list(request):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthorized()
+    queryset = await sync_to_async(Section.objects.accessible)(user)
+    return await _page(request, queryset, SectionSerializer)
+
+
+async def section_detail(request, pk):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthorized()
+    queryset = await sync_to_async(Section.objects.accessible)(user)
+    return await _detail(queryset, SectionSerializer, pk)
+
+
+async def topic_list(request):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthorized()
+    queryset = await sync_to_async(Topic.objects.accessible)(user)
+    return await _page(request, queryset, TopicSerializer)
+
+
+async def topic_detail(request, pk):
+    user = await _authenticate(request)
+    if user is None:
+        return _unauthorized()
+    queryset = await sync_to_async(Topic.objects.accessible)(user)
+    return await _detail(queryset, TopicSerializer, pk)
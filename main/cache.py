@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Время жизни закэшированного ответа в общем кэше (Redis) и размер кэша ответов в памяти процесса
+RESPONSE_CACHE_TTL = getattr(settings, 'RESPONSE_CACHE_TTL', 3600)
+RESPONSE_CACHE_LOCAL_SIZE = getattr(settings, 'RESPONSE_CACHE_LOCAL_SIZE', 1024)
+
+# Версия всего содержимого курсов, используется списками и представлениями без идентификатора модуля
+GLOBAL_SCOPE = 'all'
+
+
+def module_scope(module_id):
+    return f'module:{module_id}'
+
+
+def _version_key(scope):
+    return f'content:version:{scope}'
+
+
+def get_content_versions(*scopes):
+    """Возвращает версии содержимого для областей scopes одним обращением к общему кэшу"""
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Начальная версия уникальна во времени: если ключ версии будет вытеснен из Redis,
+            # новая версия не совпадет с прежней и устаревший ответ не будет выдан
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_content_versions(*module_ids):
+    """Увеличивает версии содержимого модулей и общую версию, что делает недействительными
+    все закэшированные ответы, построенные на прежних версиях"""
+    scopes = [GLOBAL_SCOPE] + [module_scope(module_id) for module_id in set(module_ids) if module_id is not None]
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), time.time_ns(), None)
+
+
+class LocalLRUCache:
+    """Класс LocalLRUCache хранит ограниченное количество записей в памяти процесса
+    и вытесняет записи, которые дольше всего не запрашивались"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ResponseCache:
+    """Класс ResponseCache кэширует данные ответов в памяти процесса и в общем кэше Django.
+    Ключи содержат версию содержимого, поэтому устаревшие записи не удаляются, а перестают запрашиваться"""
+
+    def __init__(self, local_size, ttl):
+        self.local = LocalLRUCache(local_size)
+        self.ttl = ttl
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        data = self.local.get(key)
+        if data is not None:
+            self._count('local_hits')
+            return data
+        data = cache.get(key)
+        if data is not None:
+            self._count('shared_hits')
+            self.local.set(key, data)
+            return data
+        self._count('misses')
+        return None
+
+    def set(self, key, data):
+        self.local.set(key, data)
+        cache.set(key, data, self.ttl)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        requests = sum(stats.values())
+        stats['hit_ratio'] = (stats['local_hits'] + stats['shared_hits']) / requests if requests else 0.0
+        return stats
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_LOCAL_SIZE, RESPONSE_CACHE_TTL)
@@ -0,0 +1,82 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Время жизни набора оплаченных модулей в общем кэше (Redis) и в памяти процесса, в секундах
+ENTITLEMENT_CACHE_TTL = getattr(settings, 'ENTITLEMENT_CACHE_TTL', 300)
+ENTITLEMENT_LOCAL_TTL = getattr(settings, 'ENTITLEMENT_LOCAL_TTL', 30)
+ENTITLEMENT_LOCAL_MAX_SIZE = getattr(settings, 'ENTITLEMENT_LOCAL_MAX_SIZE', 10000)
+
+# user_id -> (время истечения, frozenset идентификаторов оплаченных модулей)
+_local_cache = {}
+
+
+def _cache_key(user_id):
+    return f'entitlements:paid_modules:{user_id}'
+
+
+def _load_paid_module_ids(user_id):
+    """Загружает идентификаторы модулей с подтвержденной оплатой пользователя одним запросом к Payment"""
+    from main.models import Payment, PaymentStatus
+
+    return frozenset(Payment.objects.filter(user_id=user_id, status=PaymentStatus.CONFIRMED)
+                     .values_list('module_id', flat=True))
+
+
+def _store_local(user_id, module_ids):
+    now = time.monotonic()
+    if len(_local_cache) >= ENTITLEMENT_LOCAL_MAX_SIZE:
+        # Вытесняем записи с истекшим сроком, при переполнении очищаем кэш процесса целиком
+        for key in [key for key, (expires, _) in _local_cache.items() if expires <= now]:
+            _local_cache.pop(key, None)
+        if len(_local_cache) >= ENTITLEMENT_LOCAL_MAX_SIZE:
+            _local_cache.clear()
+    _local_cache[user_id] = (now + ENTITLEMENT_LOCAL_TTL, module_ids)
+
+
+def _get_shared(user_id):
+    """Возвращает набор оплаченных модулей из общего кэша, при промахе загружает его из базы данных"""
+    module_ids = cache.get(_cache_key(user_id))
+    if module_ids is None:
+        module_ids = _load_paid_module_ids(user_id)
+        cache.set(_cache_key(user_id), module_ids, ENTITLEMENT_CACHE_TTL)
+    _store_local(user_id, module_ids)
+    return module_ids
+
+
+def get_paid_module_ids(user):
+    """Возвращает frozenset идентификаторов модулей, оплаченных пользователем.
+    Набор читается из памяти процесса, затем из общего кэша и только при промахе из базы данных"""
+    user_id = getattr(user, 'id', None)
+    if user_id is None:
+        return frozenset()
+    entry = _local_cache.get(user_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    return _get_shared(user_id)
+
+
+def has_paid_module(user, module_id):
+    """Проверяет, оплатил ли пользователь модуль, проверкой принадлежности множеству"""
+    user_id = getattr(user, 'id', None)
+    if user_id is None:
+        return False
+    entry = _local_cache.get(user_id)
+    if entry is not None and entry[0] > time.monotonic() and module_id in entry[1]:
+        return True
+    # Оплата может быть записана другим процессом, поэтому отрицательный ответ из памяти
+    # процесса перепроверяется по общему кэшу, который сбрасывается при записи платежа
+    return module_id in _get_shared(user_id)
+
+
+def invalidate_paid_modules(user_id):
+    """Сбрасывает закэшированный набор оплаченных модулей пользователя"""
+    _local_cache.pop(user_id, None)
+    cache.delete(_cache_key(user_id))
+
+
+def warm_paid_modules(user_id):
+    """Заново загружает набор оплаченных модулей пользователя в кэш"""
+    invalidate_paid_modules(user_id)
+    return _get_shared(user_id)
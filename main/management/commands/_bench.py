@@ -0,0 +1,14 @@
+import statistics
+
+
+def latency_summary(latencies):
+    """Возвращает p50, p95, p99 и среднее значение длительностей latencies (в секундах) в миллисекундах"""
+    if not latencies:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None}
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'p50_ms': quantiles[49] * 1000,
+        'p95_ms': quantiles[94] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+    }
@@ -0,0 +1,268 @@
+import json
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from main.cache import response_cache
+from main.entitlements import invalidate_paid_modules
+from main.models import Module, Section, Topic, Payment, PaymentStatus
+from users.models import User
+from users.serializers import UserTokenObtainPairSerializer
+
+from ._bench import latency_summary
+
+BENCH_ADMIN_USERNAME = 'bench_admin'
+
+
+class Rollback(Exception):
+    """Исключение для отката транзакции изменяющего сценария после замера"""
+
+
+class Command(BaseCommand):
+    """Команда bench_api выполняет сценарии для всех маршрутов main/urls.py и получения JWT из users/urls.py
+    внутри процесса, через полный стек промежуточных слоев, и выводит p50/p95/p99 длительности, количество
+    SQL-запросов на запрос и строк в секунду. Изменяющие сценарии выполняются в транзакции, которая
+    откатывается после каждого запроса, поэтому повторные запуски работают на одних и тех же данных.
+    Данные создаются командой seed_courses, например для 100 000 тем:
+
+        python manage.py seed_courses --size 100k --fanout-jitter 0.5 --password bench
+        python manage.py bench_api --password bench --json --output bench-100k.json
+
+    Результаты в формате JSON можно сравнивать между коммитами"""
+    help = 'Замеряет длительность и количество SQL-запросов для всех маршрутов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='количество запросов в сценарии')
+        parser.add_argument('--warmup', type=int, default=3, help='количество запросов прогрева')
+        parser.add_argument('--scenario', action='append', dest='scenarios', help='выполнить только эти сценарии')
+        parser.add_argument('--prefix', default='bench', help='префикс имен пользователей seed_courses')
+        parser.add_argument('--password', help='пароль пользователей seed_courses для сценария получения JWT')
+        parser.add_argument('--host', default='localhost', help='значение заголовка Host (из ALLOWED_HOSTS)')
+        parser.add_argument('--cold', action='store_true', help='очищать кэши перед каждым запросом')
+        parser.add_argument('--json', action='store_true', help='вывести результат в формате JSON')
+        parser.add_argument('--output', help='записать результат в формате JSON в файл')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.load_fixtures(options['prefix'])
+        scenarios = self.get_scenarios()
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario['name'] for scenario in scenarios}
+            if unknown:
+                raise CommandError(f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+            scenarios = [scenario for scenario in scenarios if scenario['name'] in options['scenarios']]
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario['name']] = self.run_scenario(scenario)
+            if not options['json']:
+                self.write_result(scenario['name'], results[scenario['name']])
+
+        report = {'meta': self.get_meta(), 'scenarios': results}
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def load_fixtures(self, prefix):
+        payment = (Payment.objects.filter(user__username__startswith=f'{prefix}_', status=PaymentStatus.CONFIRMED,
+                                          module__sections__isnull=False)
+                   .select_related('user', 'module').order_by('id').first())
+        if payment is None:
+            raise CommandError('Нет данных для замера, заполните базу командой seed_courses.')
+        self.learner, self.paid_module, self.payment = payment.user, payment.module, payment
+        # seed_courses создает платежи через bulk_create, поэтому закэшированный набор оплаченных модулей
+        # пользователя замера может не содержать их
+        invalidate_paid_modules(self.learner.id)
+        self.section = Section.objects.accessible(self.learner).order_by('id').first()
+        self.topic = Topic.objects.accessible(self.learner).order_by('id').first()
+        if self.section is None or self.topic is None:
+            raise CommandError('Нет данных для замера, заполните базу командой seed_courses.')
+        self.admin = User.objects.filter(username=BENCH_ADMIN_USERNAME).first()
+        if self.admin is None:
+            self.admin = User.objects.create_superuser(username=BENCH_ADMIN_USERNAME,
+                                                       email=f'{BENCH_ADMIN_USERNAME}@example.com', password=None)
+        self.refresh_tokens = {'learner': UserTokenObtainPairSerializer.get_token(self.learner),
+                               'admin': UserTokenObtainPairSerializer.get_token(self.admin)}
+        self.tokens = {actor: str(token.access_token) for actor, token in self.refresh_tokens.items()}
+        self.tree_ids = ','.join(str(pk) for pk in Module.objects.accessible(self.learner)
+                                 .order_by('id').values_list('id', flat=True)[:10])
+
+    def get_scenarios(self):
+        module, section, topic = self.paid_module, self.section, self.topic
+        module_data = {'number': 1, 'title': 'Модуль для замера', 'description': 'Описание модуля для замера',
+                       'is_paid': True}
+        section_data = {'number': 1, 'title': 'Раздел для замера', 'description': 'Описание раздела для замера',
+                        'module': module.id}
+        topic_data = {'number': 1, 'title': 'Тема для замера', 'description': 'Описание темы для замера',
+                      'section': section.id}
+
+        def admin_module():
+            # Отдельный модуль администратора замера, чтобы не изменять и не удалять модули из seed_courses
+            return {'pk': Module.objects.create(user=self.admin, **module_data).pk}
+
+        def admin_section():
+            # Разделы и темы изменяются и удаляются в модуле администратора замера по той же причине
+            section = Section.objects.create(module_id=admin_module()['pk'], number=1, title=section_data['title'],
+                                             description=section_data['description'])
+            return {'pk': section.pk}
+
+        def admin_topic():
+            topic = Topic.objects.create(section_id=admin_section()['pk'], number=1, title=topic_data['title'],
+                                         description=topic_data['description'])
+            return {'pk': topic.pk}
+
+        def get(name, url_name, actor='learner', params=None, **kwargs):
+            return {'name': name, 'method': 'get', 'url_name': url_name, 'kwargs': kwargs, 'data': params,
+                    'actor': actor, 'write': False}
+
+        def write(name, method, url_name, data=None, actor='admin', setup=None, **kwargs):
+            return {'name': name, 'method': method, 'url_name': url_name, 'kwargs': kwargs, 'data': data,
+                    'actor': actor, 'write': True, 'setup': setup}
+
+        refresh = str(self.refresh_tokens['learner'])
+        return [
+            get('module-list', 'main:module-list'),
+            get('module-list-summary', 'main:module-list', params={'fields': 'summary'}),
+            get('module-retrieve', 'main:module-retrieve', pk=module.id),
+            get('module-tree', 'main:module-tree', pk=module.id),
+            get('module-tree-list', 'main:module-tree-list', params={'ids': self.tree_ids}),
+            get('section-list', 'main:section-list'),
+            get('section-list-summary', 'main:section-list', params={'fields': 'summary'}),
+            get('section-retrieve', 'main:section-retrieve', pk=section.id),
+            get('topic-list', 'main:topic-list'),
+            get('topic-list-summary', 'main:topic-list', params={'fields': 'summary'}),
+            get('topic-retrieve', 'main:topic-retrieve', pk=topic.id),
+            get('search', 'main:search', params={'q': 'учебного материала'}),
+            get('payment-status', 'main:payment-status', pk=self.payment.id),
+            get('metrics', 'main:metrics', actor='admin'),
+            get('cache-stats', 'main:cache-stats', actor='admin'),
+            get('async-module-list', 'main:async-module-list'),
+            get('async-module-retrieve', 'main:async-module-retrieve', pk=module.id),
+            get('async-module-tree', 'main:async-module-tree', pk=module.id),
+            get('async-section-list', 'main:async-section-list'),
+            get('async-section-retrieve', 'main:async-section-retrieve', pk=section.id),
+            get('async-topic-list', 'main:async-topic-list'),
+            get('async-topic-retrieve', 'main:async-topic-retrieve', pk=topic.id),
+            write('module-create', 'post', 'main:module-create', {**module_data, 'user': self.admin.id}),
+            write('module-update', 'patch', 'main:module-update', {'title': 'Измененный модуль'}, setup=admin_module),
+            write('module-destroy', 'delete', 'main:module-destroy', setup=admin_module),
+            write('section-create', 'post', 'main:section-create', section_data),
+            write('section-update', 'patch', 'main:section-update', {'title': 'Измененный раздел'},
+                  setup=admin_section),
+            write('section-destroy', 'delete', 'main:section-destroy', setup=admin_section),
+            write('section-bulk', 'post', 'main:section-bulk', [section_data] * 100),
+            write('topic-create', 'post', 'main:topic-create', topic_data),
+            write('topic-update', 'patch', 'main:topic-update', {'title': 'Измененная тема'}, setup=admin_topic),
+            write('topic-destroy', 'delete', 'main:topic-destroy', setup=admin_topic),
+            write('topic-bulk', 'post', 'main:topic-bulk', [topic_data] * 1000),
+            write('payment-create', 'post', 'main:payment-create', actor='learner', module_id=module.id),
+            write('token-obtain', 'post', 'users:token_obtain_pair', actor=None,
+                  data={'username': self.learner.username, 'password': self.options['password'] or ''}),
+            write('token-refresh', 'post', 'users:token_refresh', {'refresh': refresh}, actor=None),
+        ]
+
+    def get_client(self, actor):
+        client = APIClient(HTTP_HOST=self.options['host'])
+        if actor is not None:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens[actor]}')
+        return client
+
+    def reset_caches(self):
+        cache.clear()
+        response_cache.local.clear()
+        invalidate_paid_modules(self.learner.id)
+
+    def request(self, client, scenario):
+        kwargs = dict(scenario['kwargs'])
+        if scenario['write'] and scenario['setup'] is not None:
+            kwargs.update(scenario['setup']())
+        if self.options['cold']:
+            self.reset_caches()
+        url = reverse(scenario['url_name'], kwargs=kwargs)
+        method = getattr(client, scenario['method'])
+        extra = {} if scenario['method'] == 'get' else {'format': 'json'}
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = method(url, scenario['data'], **extra)
+            elapsed = time.perf_counter() - started
+        return response, elapsed, len(queries)
+
+    def measure(self, client, scenario):
+        if not scenario['write']:
+            return self.request(client, scenario)
+        result = None
+        try:
+            with transaction.atomic():
+                result = self.request(client, scenario)
+                raise Rollback
+        except Rollback:
+            pass
+        return result
+
+    def run_scenario(self, scenario):
+        client = self.get_client(scenario['actor'])
+        for _ in range(self.options['warmup']):
+            self.measure(client, scenario)
+
+        latencies, query_counts, statuses, rows = [], [], {}, 0
+        for _ in range(self.options['iterations']):
+            response, elapsed, query_count = self.measure(client, scenario)
+            latencies.append(elapsed)
+            query_counts.append(query_count)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            rows += self.count_rows(response)
+        total_time = sum(latencies)
+        return {
+            **latency_summary(latencies),
+            'queries': max(query_counts),
+            'rows_per_request': rows / len(latencies),
+            'rows_per_sec': rows / total_time if total_time else 0,
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        }
+
+    @staticmethod
+    def count_rows(response):
+        # Количество объектов в ответе: элементы списка или страницы, для одного объекта - 1
+        data = getattr(response, 'data', None)
+        if data is None and response.get('Content-Type', '').startswith('application/json'):
+            data = json.loads(response.content)
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            return len(data['results'])
+        if isinstance(data, list):
+            return len(data)
+        return 1 if response.status_code < 400 else 0
+
+    def get_meta(self):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                    check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'modules': Module.objects.count(),
+            'sections': Section.objects.count(),
+            'topics': Topic.objects.count(),
+            'payments': Payment.objects.count(),
+            'iterations': self.options['iterations'],
+            'cold': self.options['cold'],
+        }
+
+    def write_result(self, name, result):
+        statuses = ', '.join(f'{code}: {count}' for code, count in result['statuses'].items())
+        self.stdout.write(
+            f'{name:<24} p50 {result["p50_ms"]:8.2f} мс  p95 {result["p95_ms"]:8.2f} мс  '
+            f'p99 {result["p99_ms"]:8.2f} мс  запросов {result["queries"]:3}  '
+            f'{result["rows_per_sec"]:12,.0f} строк/с  [{statuses}]'
+        )
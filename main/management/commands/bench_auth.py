@@ -0,0 +1,73 @@
+import json
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import CachedJWTAuthentication
+from users.models import User
+from users.serializers import UserTokenObtainPairSerializer
+
+from ._bench import latency_summary
+
+
+class Command(BaseCommand):
+    """Команда bench_auth замеряет стоимость аутентификации одного запроса: стандартный JWTAuthentication
+    с токеном без утверждений о пользователе и CachedJWTAuthentication с токеном, выданным
+    UserTokenObtainPairSerializer. Для каждого варианта выводятся p50/p95/p99 длительности
+    и количество SQL-запросов на запрос:
+
+        python manage.py bench_auth --iterations 10000"""
+    help = 'Замеряет длительность и количество SQL-запросов аутентификации по JWT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000, help='количество запросов в сценарии')
+        parser.add_argument('--username', help='пользователь, для которого выдается токен')
+        parser.add_argument('--json', action='store_true', help='вывести результат в формате JSON')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']) if options['username'] else User.objects
+        user = user.filter(is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('Нет активного пользователя для выдачи токена.')
+
+        scenarios = {
+            'jwt': (JWTAuthentication(), AccessToken.for_user(user)),
+            'cached-jwt-cold': (CachedJWTAuthentication(), UserTokenObtainPairSerializer.get_token(user).access_token),
+            'cached-jwt': (CachedJWTAuthentication(), UserTokenObtainPairSerializer.get_token(user).access_token),
+        }
+        results = {}
+        for name, (authentication, token) in scenarios.items():
+            # Сценарий cached-jwt-cold очищает кэш перед каждым запросом: версия прав и поля пользователя
+            # загружаются заново, как после вытеснения ключей или перезапуска Redis
+            results[name] = self.run_scenario(authentication, str(token), options['iterations'],
+                                              cold=name.endswith('-cold'))
+            if not options['json']:
+                self.write_result(name, results[name])
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+
+    @staticmethod
+    def run_scenario(authentication, token, iterations, cold=False):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        latencies, query_counts = [], []
+        for _ in range(iterations):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                authentication.authenticate(request)
+                latencies.append(time.perf_counter() - started)
+            query_counts.append(len(queries))
+        return {**latency_summary(latencies), 'queries': max(query_counts)}
+
+    def write_result(self, name, result):
+        self.stdout.write(
+            f'{name:<16} p50 {result["p50_ms"]:8.3f} мс  p95 {result["p95_ms"]:8.3f} мс  '
+            f'p99 {result["p99_ms"]:8.3f} мс  запросов {result["queries"]:3}'
+        )
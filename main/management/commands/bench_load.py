@@ -0,0 +1,72 @@
+import asyncio
+import json
+import time
+
+import httpx
+from django.core.management.base import BaseCommand
+
+from ._bench import latency_summary
+
+DEFAULT_PATHS = ('module/', 'section/', 'topic/')
+
+
+class Command(BaseCommand):
+    """Команда bench_load отправляет параллельные запросы к запущенному серверу и выводит пропускную
+    способность и задержки. Для сравнения WSGI и ASGI запустите docker-compose и выполните команду
+    для http://localhost:8001/ (runserver, синхронные представления) и http://localhost:8002/ с префиксом
+    async/ (uvicorn, асинхронные представления), например: bench_load http://localhost:8002/ --prefix async/"""
+    help = 'Измеряет пропускную способность сервера при параллельных запросах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help='адрес сервера, например http://localhost:8001/')
+        parser.add_argument('--prefix', default='', help='префикс путей, например async/')
+        parser.add_argument('--path', action='append', dest='paths', help='путь для запросов, можно указать несколько')
+        parser.add_argument('--token', help='JWT для заголовка Authorization')
+        parser.add_argument('--concurrency', type=int, default=50, help='количество одновременных запросов')
+        parser.add_argument('--requests', type=int, default=2000, help='общее количество запросов')
+        parser.add_argument('--json', action='store_true', help='вывести результат в формате JSON')
+
+    def handle(self, *args, **options):
+        result = asyncio.run(self.run(options))
+        if options['json']:
+            self.stdout.write(json.dumps(result, ensure_ascii=False, indent=2))
+            return
+        self.stdout.write(
+            f'{result["requests"]} запросов, параллельно {result["concurrency"]}: {result["rps"]:,.0f} запросов/с, '
+            f'p50 {result["p50_ms"]:.1f} мс, p95 {result["p95_ms"]:.1f} мс, p99 {result["p99_ms"]:.1f} мс, '
+            f'ошибок {result["errors"]}'
+        )
+
+    async def run(self, options):
+        paths = [options['prefix'] + path for path in (options['paths'] or DEFAULT_PATHS)]
+        headers = {'Authorization': f'Bearer {options["token"]}'} if options['token'] else {}
+        total, concurrency = options['requests'], options['concurrency']
+        latencies, errors = [], 0
+        counter = iter(range(total))
+
+        async def worker(client):
+            nonlocal errors
+            for number in counter:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[number % len(paths)])
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=options['base_url'], headers=headers, limits=limits,
+                                     timeout=60) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        return {
+            'requests': total,
+            'concurrency': concurrency,
+            'rps': total / elapsed,
+            **latency_summary(latencies),
+            'errors': errors,
+        }
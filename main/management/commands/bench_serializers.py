@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import Module, Section, Topic
+from main.serializers import ModuleSerializer, SectionSerializer, TopicSerializer, ValuesSerializer
+
+
+class Command(BaseCommand):
+    """Команда bench_serializers сравнивает скорость сериализации списков (строк в секунду)
+    сериализаторами ModelSerializer и быстрым режимом ValuesSerializer на данных из базы"""
+    help = 'Сравнивает скорость сериализации списков ModelSerializer и ValuesSerializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='количество строк в выборке')
+        parser.add_argument('--repeat', type=int, default=5, help='количество повторов замера')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        cases = (
+            ('module', Module, ModuleSerializer),
+            ('section', Section, SectionSerializer),
+            ('topic', Topic, TopicSerializer),
+        )
+        for name, model, serializer_class in cases:
+            queryset = model.objects.order_by('id')[:rows]
+            count = queryset.count()
+            if not count:
+                raise CommandError(f'Нет данных модели {model.__name__}, заполните базу командой seed_courses.')
+            values_serializer = ValuesSerializer.for_serializer(serializer_class)
+
+            model_time = self.measure(repeat, lambda: serializer_class(list(queryset), many=True).data)
+            values_time = self.measure(repeat, lambda: values_serializer.to_representation(
+                values_serializer.values(queryset)))
+
+            self.stdout.write(
+                f'{name}: {count} строк, ModelSerializer {count / model_time:,.0f} строк/с, '
+                f'ValuesSerializer {count / values_time:,.0f} строк/с, ускорение {model_time / values_time:.1f}x'
+            )
+
+    @staticmethod
+    def measure(repeat, func):
+        # Лучшее время из нескольких повторов, включая чтение строк из базы данных
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
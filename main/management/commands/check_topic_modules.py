@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main.cache import bump_content_versions
+from main.models import Topic
+
+
+class Command(BaseCommand):
+    """Команда check_topic_modules находит темы, у которых денормализованный модуль не совпадает с модулем
+    раздела (например, после изменения данных в обход моделей), и исправляет их пакетами. Каждый пакет
+    исправляется отдельной транзакцией, поэтому команда не блокирует таблицу тем надолго"""
+    help = 'Проверяет и исправляет денормализованный модуль тем'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='количество тем в пакете')
+        parser.add_argument('--dry-run', action='store_true', help='только вывести количество расхождений')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        stale = Topic.objects.with_stale_module().order_by('id')
+        if options['dry_run']:
+            self.stdout.write(f'Тем с расхождением модуля: {stale.count()}')
+            return
+
+        fixed, last_id = 0, 0
+        while True:
+            ids = list(stale.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                topics = Topic.objects.filter(id__in=ids)
+                module_ids = set(topics.values_list('module_id', flat=True))
+                fixed += topics.sync_module()
+                module_ids.update(topics.values_list('module_id', flat=True))
+            bump_content_versions(*module_ids)
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f'Исправлено тем: {fixed}'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main.models import Module, Section, Topic, Payment
+
+
+class Command(BaseCommand):
+    """Команда explain_queries выводит планы выполнения основных запросов API: списков и детального
+    просмотра разделов и тем, дерева модуля и проверки доступа по платежам. Для сравнения планов до и
+    после добавления индексов заполните базу командой seed_courses, выполните explain_queries, откатите
+    миграцию командой migrate main 0003, снова выполните explain_queries и примените миграции заново"""
+    help = 'Выводит планы выполнения запросов списков, детального просмотра и проверки доступа'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='выполнить запросы (EXPLAIN ANALYZE)')
+
+    def handle(self, *args, **options):
+        section = Section.objects.order_by('-id').first()
+        topic = Topic.objects.order_by('-id').first()
+        payment = Payment.objects.order_by('-id').first()
+        if section is None or topic is None or payment is None:
+            raise CommandError('База данных пуста, заполните ее командой seed_courses.')
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        queries = {
+            'section-list': Section.objects.accessible(payment.user).order_by('id')[:50],
+            'topic-list': Topic.objects.accessible(payment.user).order_by('id')[:50],
+            'section-retrieve': Section.objects.accessible(payment.user).filter(pk=section.pk),
+            'topic-retrieve': Topic.objects.accessible(payment.user).filter(pk=topic.pk),
+            'module-tree-sections': Section.objects.filter(module_id=section.module_id).order_by('number', 'id'),
+            'module-tree-topics': Topic.objects.filter(section_id=topic.section_id).order_by('number', 'id'),
+            'paid-modules': Payment.objects.filter(user_id=payment.user_id).values_list('module_id', flat=True),
+            'payment-exists': Module.objects.filter(payment__user_id=payment.user_id, pk=payment.module_id),
+        }
+        for name, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
@@ -0,0 +1,58 @@
+import gzip
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.models import Module, Section, Topic, Payment
+
+MODULE_FIELDS = ('id', 'number', 'title', 'description', 'is_paid', 'user__email')
+SECTION_FIELDS = ('id', 'module_id', 'number', 'title', 'description')
+TOPIC_FIELDS = ('id', 'section_id', 'number', 'title', 'description')
+PAYMENT_FIELDS = ('user__email', 'amount', 'status')
+
+
+class Command(BaseCommand):
+    """Команда export_course выгружает модуль с разделами, темами и, по желанию, платежами в файл NDJSON,
+    сжатый gzip: по одному объекту в строке, сначала модуль, затем разделы, темы и платежи.
+    Строки читаются из базы данных потоком через .iterator(), поэтому память не зависит от объема курса"""
+    help = 'Выгружает модуль с разделами, темами и платежами в файл NDJSON (gzip)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('module_id', type=int, help='идентификатор модуля')
+        parser.add_argument('output', help='путь к файлу .ndjson.gz')
+        parser.add_argument('--with-payments', action='store_true', help='выгрузить платежи за модуль')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='количество строк, читаемых за раз')
+
+    def handle(self, *args, **options):
+        module = Module.objects.filter(id=options['module_id']).values(*MODULE_FIELDS).first()
+        if module is None:
+            raise CommandError(f'Модуль {options["module_id"]} не найден.')
+        chunk_size = options['chunk_size']
+        started = time.perf_counter()
+
+        streams = [
+            ('module', [module]),
+            ('section', Section.objects.filter(module_id=module['id']).order_by('id')
+             .values(*SECTION_FIELDS).iterator(chunk_size=chunk_size)),
+            ('topic', Topic.objects.filter(module_id=module['id']).order_by('id')
+             .values(*TOPIC_FIELDS).iterator(chunk_size=chunk_size)),
+        ]
+        if options['with_payments']:
+            streams.append(('payment', Payment.objects.filter(module_id=module['id']).order_by('id')
+                            .values(*PAYMENT_FIELDS).iterator(chunk_size=chunk_size)))
+
+        counts = {}
+        with gzip.open(options['output'], 'wt', encoding='utf-8') as output:
+            for kind, rows in streams:
+                counts[kind] = 0
+                for row in rows:
+                    output.write(json.dumps({'type': kind, **row}, ensure_ascii=False, default=str))
+                    output.write('\n')
+                    counts[kind] += 1
+
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено строк: {total} ({counts}) за {elapsed:.1f} c, {total / elapsed:,.0f} строк/с'
+        ))
@@ -0,0 +1,136 @@
+import gzip
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main.cache import bump_content_versions
+from main.entitlements import invalidate_paid_modules
+from main.models import Module, Section, Topic, Payment
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Команда import_course загружает модуль, выгруженный командой export_course. Объекты читаются из файла
+    потоком и записываются пакетами через bulk_create. Идентификаторы разделов из файла сопоставляются
+    с новыми идентификаторами, чтобы связи Section.module и Topic.section указывали на созданные объекты.
+    Для замера пропускной способности заполните базу командой seed_courses --modules 1 --sections 1000
+    --topics 1000 и выгрузите, а затем загрузите полученный модуль: команды выводят количество строк в секунду"""
+    help = 'Загружает модуль с разделами, темами и платежами из файла NDJSON (gzip)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='путь к файлу .ndjson.gz')
+        parser.add_argument('--owner', help='имя пользователя - владельца модуля, по умолчанию владелец из файла')
+        parser.add_argument('--batch-size', type=int, default=2000, help='размер пакета вставки')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.owner_username = options['owner']
+        self.module = None
+        self.section_ids = {}
+        self.counts = {'module': 0, 'section': 0, 'topic': 0, 'payment': 0}
+        self.payment_user_ids = set()
+        self.batches = {'section': [], 'topic': [], 'payment': []}
+        started = time.perf_counter()
+
+        with gzip.open(options['input'], 'rt', encoding='utf-8') as source, transaction.atomic():
+            for number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                kind = row.pop('type')
+                if kind == 'module':
+                    self.create_module(row)
+                elif kind in self.batches:
+                    if self.module is None:
+                        raise CommandError(f'Строка {number}: объект {kind} указан до модуля.')
+                    self.add(kind, row)
+                else:
+                    raise CommandError(f'Строка {number}: неизвестный тип объекта {kind}.')
+            for kind in self.batches:
+                self.flush(kind)
+            if self.module is not None:
+                # Платежи записываются с ignore_conflicts: повторяющиеся строки файла пропускаются базой данных,
+                # поэтому количество записанных платежей определяется после загрузки
+                self.counts['payment'] = Payment.objects.filter(module=self.module).count()
+                # Объекты записаны через bulk_create, поэтому счетчики и столбцы поиска вычисляются после загрузки
+                Module.objects.filter(pk=self.module.pk).refresh_counters()
+                Section.objects.filter(module=self.module).update_search_vector()
+                Topic.objects.filter(module=self.module).update_search_vector()
+
+        if self.module is None:
+            raise CommandError('В файле нет модуля.')
+        # bulk_create не вызывает сигналы, поэтому кэши сбрасываются явно: ответы с содержимым модуля
+        # и наборы оплаченных модулей пользователей, платежи которых загружены
+        bump_content_versions(self.module.id)
+        for user_id in self.payment_user_ids:
+            invalidate_paid_modules(user_id)
+
+        elapsed = time.perf_counter() - started
+        total = sum(self.counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружен модуль {self.module.id}, строк: {total} ({self.counts}) за {elapsed:.1f} c, '
+            f'{total / elapsed:,.0f} строк/с'
+        ))
+
+    def create_module(self, row):
+        if self.module is not None:
+            raise CommandError('Файл должен содержать один модуль.')
+        if self.owner_username:
+            owner = User.objects.filter(username=self.owner_username).first()
+        else:
+            owner = User.objects.filter(email=row['user__email']).first()
+        if owner is None:
+            raise CommandError('Владелец модуля не найден, укажите его параметром --owner.')
+        self.module = Module.objects.create(user=owner, number=row['number'], title=row['title'],
+                                            description=row['description'], is_paid=row['is_paid'])
+        self.counts['module'] += 1
+
+    def add(self, kind, row):
+        # Разделы записываются раньше тем, поэтому перед первой темой все разделы уже получили новые идентификаторы
+        if kind != 'section':
+            self.flush('section')
+        batch = self.batches[kind]
+        batch.append(row)
+        if len(batch) >= self.batch_size:
+            self.flush(kind)
+
+    def flush(self, kind):
+        batch = self.batches[kind]
+        if not batch:
+            return
+        self.counts[kind] += getattr(self, f'create_{kind}s')(batch)
+        self.batches[kind] = []
+
+    def create_sections(self, rows):
+        sections = Section.objects.bulk_create([
+            Section(module=self.module, number=row['number'], title=row['title'], description=row['description'])
+            for row in rows
+        ])
+        for row, section in zip(rows, sections):
+            self.section_ids[row['id']] = section.id
+        return len(sections)
+
+    def create_topics(self, rows):
+        topics = []
+        for row in rows:
+            if row['section_id'] not in self.section_ids:
+                raise CommandError(f'Тема {row["id"]} ссылается на раздел {row["section_id"]}, которого нет в файле.')
+            topics.append(Topic(section_id=self.section_ids[row['section_id']], module=self.module,
+                                number=row['number'], title=row['title'], description=row['description']))
+        return len(Topic.objects.bulk_create(topics))
+
+    def create_payments(self, rows):
+        users = dict(User.objects.filter(email__in={row['user__email'] for row in rows})
+                     .values_list('email', 'id'))
+        payments = [
+            Payment(user_id=users[row['user__email']], module=self.module, amount=Decimal(row['amount']),
+                    status=row['status'])
+            for row in rows if row['user__email'] in users
+        ]
+        Payment.objects.bulk_create(payments, ignore_conflicts=True)
+        self.payment_user_ids.update(payment.user_id for payment in payments)
+        # Количество записанных платежей вычисляется в handle после загрузки всех пакетов
+        return 0
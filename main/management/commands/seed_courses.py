@@ -0,0 +1,125 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from main.models import Module, Section, Topic, Payment, PaymentStatus
+from users.models import User
+
+# Наборы данных для замеров: количество модулей, разделов в модуле и тем в разделе
+SIZES = {
+    '1k': (10, 10, 10),
+    '100k': (50, 40, 50),
+    '1m': (100, 100, 100),
+}
+
+DESCRIPTION = ('Синтетическое описание учебного материала для нагрузочного тестирования. '
+               'Текст повторяется, чтобы размер строки соответствовал реальным данным. ') * 3
+
+
+class Command(BaseCommand):
+    """Команда seed_courses заполняет базу данных синтетическими пользователями, модулями, разделами,
+    темами и платежами. Строки вставляются пакетами через bulk_create, поэтому память не растет
+    с объемом данных. Значения по умолчанию создают 1 000 000 тем (100 модулей x 100 разделов x 100 тем),
+    параметр --size задает готовый набор из 1 000, 100 000 или 1 000 000 тем. Параметр --fanout-jitter
+    делает количество разделов и тем разным для разных модулей и разделов, как в реальных курсах"""
+    help = 'Заполняет базу данных синтетическими модулями, разделами, темами и платежами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='количество пользователей')
+        parser.add_argument('--modules', type=int, default=100, help='количество модулей')
+        parser.add_argument('--sections', type=int, default=100, help='количество разделов в модуле')
+        parser.add_argument('--topics', type=int, default=100, help='количество тем в разделе')
+        parser.add_argument('--payments', type=int, default=5, help='количество оплаченных модулей у пользователя')
+        parser.add_argument('--paid-ratio', type=float, default=0.5, help='доля модулей, открытых для всех')
+        parser.add_argument('--batch-size', type=int, default=5000, help='размер пакета вставки')
+        parser.add_argument('--seed', type=int, default=0, help='начальное значение генератора случайных чисел')
+        parser.add_argument('--prefix', default='bench', help='префикс имен пользователей')
+        parser.add_argument('--size', choices=SIZES, help='готовый набор данных, заменяет --modules, '
+                                                          '--sections и --topics')
+        parser.add_argument('--fanout-jitter', type=float, default=0.0,
+                            help='разброс количества разделов и тем, например 0.5 - от 50%% до 150%%')
+        parser.add_argument('--password', help='пароль пользователей, нужен для замера получения JWT')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.jitter = options['fanout_jitter']
+        if options['size']:
+            options['modules'], options['sections'], options['topics'] = SIZES[options['size']]
+        started = time.perf_counter()
+
+        users = self.create_users(options['prefix'], options['users'], options['password'])
+        modules = self.create_modules(users, options['modules'], options['paid_ratio'])
+        sections = self.create_sections(modules, options['sections'])
+        topic_count = self.create_topics(sections, options['topics'])
+        payment_count = self.create_payments(users, modules, options['payments'])
+        module_ids = [module.pk for module in modules]
+        Module.objects.filter(pk__in=module_ids).refresh_counters()
+        Module.objects.filter(pk__in=module_ids).update_search_vector()
+        Section.objects.filter(module_id__in=module_ids).update_search_vector()
+        Topic.objects.filter(module_id__in=module_ids).update_search_vector()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, модулей: {len(modules)}, разделов: {len(sections)}, '
+            f'тем: {topic_count}, платежей: {payment_count} за {elapsed:.1f} c'
+        ))
+
+    def bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def fanout(self, count):
+        # Количество дочерних объектов со случайным разбросом, среднее значение сохраняется
+        if not self.jitter:
+            return count
+        return max(1, round(count * self.rng.uniform(1 - self.jitter, 1 + self.jitter)))
+
+    def create_users(self, prefix, count, password=None):
+        password = make_password(password)
+        return self.bulk_create(User, [
+            User(username=f'{prefix}_{number}', email=f'{prefix}_{number}@example.com', password=password)
+            for number in range(count)
+        ])
+
+    def create_modules(self, users, count, paid_ratio):
+        return self.bulk_create(Module, [
+            Module(user=self.rng.choice(users), number=number, title=f'Модуль {number}',
+                   description=DESCRIPTION, is_paid=self.rng.random() < paid_ratio)
+            for number in range(1, count + 1)
+        ])
+
+    def create_sections(self, modules, per_module):
+        return self.bulk_create(Section, [
+            Section(module=module, number=number, title=f'Раздел {number}', description=DESCRIPTION)
+            for module in modules
+            for number in range(1, self.fanout(per_module) + 1)
+        ])
+
+    def create_topics(self, sections, per_section):
+        # Темы формируются и вставляются пакетами, чтобы не держать в памяти все объекты сразу
+        batch, total = [], 0
+        for section in sections:
+            for number in range(1, self.fanout(per_section) + 1):
+                batch.append(Topic(section=section, module_id=section.module_id, number=number,
+                                   title=f'Тема {number}', description=DESCRIPTION))
+                if len(batch) >= self.batch_size:
+                    total += len(self.bulk_create(Topic, batch))
+                    batch = []
+        if batch:
+            total += len(self.bulk_create(Topic, batch))
+        return total
+
+    def create_payments(self, users, modules, per_user):
+        batch, total = [], 0
+        per_user = min(per_user, len(modules))
+        for user in users:
+            for module in self.rng.sample(modules, per_user):
+                batch.append(Payment(user=user, module=module, amount=100, status=PaymentStatus.CONFIRMED))
+            if len(batch) >= self.batch_size:
+                total += len(self.bulk_create(Payment, batch))
+                batch = []
+        if batch:
+            total += len(self.bulk_create(Payment, batch))
+        return total
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_celery_beat.models import IntervalSchedule, PeriodicTask
+
+from main.progress import PROGRESS_FLUSH_SECONDS
+
+# Периодичность сверки счетчиков модулей, в минутах
+MODULE_COUNTERS_RECONCILE_MINUTES = getattr(settings, 'MODULE_COUNTERS_RECONCILE_MINUTES', 60)
+
+
+class Command(BaseCommand):
+    """Команда setup_periodic_tasks записывает расписание периодических задач в базу данных django-celery-beat.
+    Повторный запуск обновляет существующие задачи, поэтому команду можно выполнять при каждом развертывании"""
+    help = 'Создает или обновляет периодические задачи celery beat'
+
+    def handle(self, *args, **options):
+        schedule, _ = IntervalSchedule.objects.get_or_create(every=MODULE_COUNTERS_RECONCILE_MINUTES,
+                                                             period=IntervalSchedule.MINUTES)
+        PeriodicTask.objects.update_or_create(
+            name='reconcile-module-counters',
+            defaults={'task': 'main.tasks.reconcile_module_counters', 'interval': schedule, 'enabled': True},
+        )
+        schedule, _ = IntervalSchedule.objects.get_or_create(every=PROGRESS_FLUSH_SECONDS,
+                                                             period=IntervalSchedule.SECONDS)
+        PeriodicTask.objects.update_or_create(
+            name='flush-topic-progress',
+            defaults={'task': 'main.tasks.flush_topic_progress', 'interval': schedule, 'enabled': True},
+        )
+        self.stdout.write(self.style.SUCCESS('Периодические задачи обновлены'))
@@ -0,0 +1,84 @@
+import bisect
+import threading
+from collections import defaultdict
+
+# Границы интервалов гистограмм: длительность в секундах и количество SQL-запросов
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Класс Histogram накапливает наблюдения по интервалам, сумму и количество наблюдений
+    в формате гистограммы Prometheus"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """Класс MetricsRegistry хранит метрики запросов текущего процесса: гистограммы длительности запроса,
+    времени работы с базой данных, времени сериализации ответа и количества SQL-запросов по имени URL,
+    а также счетчик ответов по статусу. Каждый процесс сервера хранит собственные значения"""
+    histograms = (
+        ('http_request_duration_seconds', 'Длительность обработки запроса', DURATION_BUCKETS, 'total'),
+        ('http_request_db_duration_seconds', 'Время выполнения SQL-запросов', DURATION_BUCKETS, 'db'),
+        ('http_request_serialize_duration_seconds', 'Время сериализации ответа', DURATION_BUCKETS, 'serialize'),
+        ('http_request_queries', 'Количество SQL-запросов', QUERY_COUNT_BUCKETS, 'queries'),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {name: {} for name, _, _, _ in self.histograms}
+            self._responses = defaultdict(int)
+
+    def observe(self, view, method, status_code, values):
+        """Записывает значения одного запроса: values содержит ключи total, db, serialize и queries"""
+        labels = (view, method)
+        with self._lock:
+            for name, _, buckets, key in self.histograms:
+                if values.get(key) is None:
+                    continue
+                histogram = self._histograms[name].get(labels)
+                if histogram is None:
+                    histogram = self._histograms[name][labels] = Histogram(buckets)
+                histogram.observe(values[key])
+            self._responses[(view, method, str(status_code))] += 1
+
+    def render(self):
+        """Возвращает метрики в текстовом формате Prometheus"""
+        lines = ['# HELP http_responses_total Количество ответов', '# TYPE http_responses_total counter']
+        with self._lock:
+            for (view, method, status_code), count in sorted(self._responses.items()):
+                lines.append(f'http_responses_total{{view="{view}",method="{method}",status="{status_code}"}} '
+                             f'{count}')
+            for name, help_text, _, _ in self.histograms:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (view, method), histogram in sorted(self._histograms[name].items()):
+                    labels = f'view="{view}",method="{method}"'
+                    for bound, count in histogram.cumulative_counts():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
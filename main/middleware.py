@@ -0,0 +1,100 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+from .metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Количество SQL-запросов, при превышении которого запросы записываются в журнал (None - не записывать)
+REQUEST_QUERY_LOG_THRESHOLD = getattr(settings, 'REQUEST_QUERY_LOG_THRESHOLD', 50)
+
+
+class QueryRecorder:
+    """Обертка выполнения SQL-запросов: считает запросы и время их выполнения, а при включенном
+    журналировании сохраняет текст запросов"""
+
+    def __init__(self, keep_sql):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_sql = keep_sql
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            if self.keep_sql:
+                self.queries.append((duration, sql))
+
+
+class RequestMetricsMiddleware:
+    """Класс RequestMetricsMiddleware измеряет для каждого запроса количество SQL-запросов, время работы
+    с базой данных, время сериализации ответа (рендеринга DRF) и общую длительность. Значения добавляются
+    в заголовок Server-Timing и в гистограммы по имени URL, доступные по адресу /metrics/. Для асинхронных
+    представлений SQL-запросы выполняются в другом потоке, поэтому учитываются только длительности"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        recorder = QueryRecorder(keep_sql=REQUEST_QUERY_LOG_THRESHOLD is not None)
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        self.finish(request, response, started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.finish(request, response, started, None)
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответ DRF сериализуется при рендеринге, который выполняется после этого метода
+        request._metrics_render_started = time.perf_counter()
+
+        def render_finished(rendered_response):
+            request._metrics_serialize = time.perf_counter() - request._metrics_render_started
+
+        response.add_post_render_callback(render_finished)
+        return response
+
+    def finish(self, request, response, started, recorder):
+        total = time.perf_counter() - started
+        serialize = getattr(request, '_metrics_serialize', None)
+        values = {'total': total, 'serialize': serialize}
+        timings = []
+        if recorder is not None:
+            values.update(db=recorder.duration, queries=recorder.count)
+            timings.append(f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"')
+        if serialize is not None:
+            timings.append(f'serialize;dur={serialize * 1000:.1f}')
+        timings.append(f'total;dur={total * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(timings)
+
+        match = request.resolver_match
+        view = match.url_name if match is not None and match.url_name else 'unmatched'
+        metrics_registry.observe(view, request.method, response.status_code, values)
+
+        if recorder is not None and REQUEST_QUERY_LOG_THRESHOLD is not None \
+                and recorder.count > REQUEST_QUERY_LOG_THRESHOLD:
+            logger.warning(
+                '%s %s (%s): %d SQL-запросов, %.1f мс\n%s', request.method, request.get_full_path(), view,
+                recorder.count, recorder.duration * 1000,
+                '\n'.join(f'[{duration * 1000:.1f} мс] {sql}' for duration, sql in recorder.queries),
+            )
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_payments(apps, schema_editor):
+    """Удаляет повторные платежи пользователя за один модуль, оставляя самый ранний"""
+    Payment = apps.get_model('main', 'Payment')
+    duplicates = (Payment.objects.values('user_id', 'module_id')
+                  .annotate(first_id=Min('id'), total=Count('id'))
+                  .filter(total__gt=1))
+    for row in duplicates.iterator():
+        (Payment.objects.filter(user_id=row['user_id'], module_id=row['module_id'])
+         .exclude(id=row['first_id']).delete())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_section_module_is_paid_topic_section_module_payment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='section',
+            index=models.Index(fields=['module', 'number'], name='section_module_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['section', 'number'], name='topic_section_number_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_payments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('user', 'module'), name='payment_user_module_uniq'),
+        ),
+    ]
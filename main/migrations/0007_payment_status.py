@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_payment_idempotency_key'),
+    ]
+
+    operations = [
+        # Платежи, записанные до появления подтверждения, считаются подтвержденными
+        migrations.AddField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает подтверждения'), ('confirmed', 'Подтвержден'),
+                                            ('failed', 'Отклонен')],
+                                   default='confirmed', max_length=10, verbose_name='статус платежа'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает подтверждения'), ('confirmed', 'Подтвержден'),
+                                            ('failed', 'Отклонен')],
+                                   default='pending', max_length=10, verbose_name='статус платежа'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_topic_modules(apps, schema_editor):
+    """Заполняет модуль темы модулем ее раздела одним запросом UPDATE"""
+    Section = apps.get_model('main', 'Section')
+    Topic = apps.get_model('main', 'Topic')
+    Topic.objects.update(module_id=Subquery(
+        Section.objects.filter(pk=OuterRef('section_id')).values('module_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_payment_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='module',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='topics', to='main.module', verbose_name='Модуль'),
+        ),
+        migrations.RunPython(fill_topic_modules, migrations.RunPython.noop),
+    ]
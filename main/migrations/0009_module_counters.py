@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_module_counters(apps, schema_editor):
+    """Вычисляет счетчики разделов, тем и слушателей всех модулей одним запросом UPDATE"""
+    Module = apps.get_model('main', 'Module')
+    Section = apps.get_model('main', 'Section')
+    Topic = apps.get_model('main', 'Topic')
+    Payment = apps.get_model('main', 'Payment')
+
+    def count_by_module(queryset):
+        return Coalesce(Subquery(queryset.filter(module_id=OuterRef('pk')).order_by().values('module_id')
+                                 .annotate(total=Count('id')).values('total')), 0)
+
+    Module.objects.update(
+        section_count=count_by_module(Section.objects.all()),
+        topic_count=count_by_module(Topic.objects.all()),
+        learner_count=count_by_module(Payment.objects.filter(status='confirmed')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_topic_module'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='section_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество разделов'),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='topic_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество тем'),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='learner_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество слушателей'),
+        ),
+        migrations.RunPython(fill_module_counters, migrations.RunPython.noop),
+    ]
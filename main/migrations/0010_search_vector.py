@@ -0,0 +1,67 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+class PostgreSQLAddIndex(migrations.AddIndex):
+    """Добавляет индекс только в PostgreSQL: GIN-индекс не поддерживается SQLite, на которой выполняются тесты"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Заполняет столбцы полнотекстового поиска модулей, разделов и тем"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    vector = None
+    for config in ('russian', 'english'):
+        for field, weight in (('title', 'A'), ('description', 'B')):
+            part = SearchVector(field, config=config, weight=weight)
+            vector = part if vector is None else vector + part
+    for model_name in ('Module', 'Section', 'Topic'):
+        apps.get_model('main', model_name).objects.update(search_vector=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_module_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        PostgreSQLAddIndex(
+            model_name='module',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='module_search_vector_idx'),
+        ),
+        PostgreSQLAddIndex(
+            model_name='section',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='section_search_vector_idx'),
+        ),
+        PostgreSQLAddIndex(
+            model_name='topic',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='topic_search_vector_idx'),
+        ),
+    ]
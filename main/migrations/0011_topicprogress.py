@@ -0,0 +1,38 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('main', '0010_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0, verbose_name='пройдено, %')),
+                ('time_spent', models.PositiveIntegerField(default=0, verbose_name='время в теме, с')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='дата завершения темы')),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True,
+                                                      verbose_name='дата последнего просмотра')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress',
+                                            to='main.topic', verbose_name='тема')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='topic_progress', to=settings.AUTH_USER_MODEL,
+                                           verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'Прогресс по теме',
+                'verbose_name_plural': 'Прогресс по темам',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='topicprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'topic'), name='topic_progress_user_topic_uniq'),
+        ),
+    ]
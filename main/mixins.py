@@ -0,0 +1,193 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .cache import GLOBAL_SCOPE, bump_content_versions, get_content_versions, module_scope, response_cache
+from .entitlements import get_paid_module_ids
+from .serializers import ValuesSerializer
+
+# Параметр запроса, которым выбирается краткое представление списка: ?fields=summary
+SUMMARY_QUERY_PARAM = 'fields'
+SUMMARY_QUERY_VALUE = 'summary'
+
+
+class ValuesListMixin:
+    """Класс ValuesListMixin переводит списочное представление в быстрый режим только для чтения:
+    строки читаются через .values() и преобразуются в словари без создания экземпляров модели"""
+
+    def get_values_serializer(self):
+        return ValuesSerializer.for_serializer(self.get_serializer_class())
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        queryset = values_serializer.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+
+        return Response(values_serializer.to_representation(queryset))
+
+
+class SummaryListMixin:
+    """Класс SummaryListMixin позволяет запросить краткое представление списка параметром ?fields=summary.
+    Из базы данных читаются только поля краткого сериализатора, тяжелые текстовые описания не загружаются"""
+    summary_serializer_class = None
+
+    def is_summary(self):
+        return (self.summary_serializer_class is not None
+                and self.request.query_params.get(SUMMARY_QUERY_PARAM) == SUMMARY_QUERY_VALUE)
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return self.summary_serializer_class
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.is_summary():
+            queryset = queryset.only(*ValuesSerializer.for_serializer(self.summary_serializer_class).columns)
+        return queryset
+
+
+class ConditionalGetMixin:
+    """Класс ConditionalGetMixin добавляет к ответам строгий ETag и Last-Modified и отвечает 304,
+    если содержимое не изменилось. Состояние содержимого определяется одним агрегирующим запросом
+    MAX(updated_at) и COUNT, поэтому повторный запрос не выполняет выборку строк и сериализацию"""
+    # Поля, по которым определяется дата последнего изменения и количество строк содержимого
+    last_modified_fields = ('updated_at',)
+    count_fields = ('id',)
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    @staticmethod
+    def get_related_subquery(model, field, function):
+        """Возвращает подзапрос, агрегирующий строки обратной связи (sections, topics) для каждой строки
+        основной выборки, или None для полей самой модели. Каждая связь агрегируется отдельным подзапросом:
+        соединение нескольких связей в одном запросе перемножает их строки"""
+        name, _, related_field = field.partition('__')
+        relation = model._meta.get_field(name)
+        if not relation.one_to_many:
+            return None
+        remote_name = relation.field.name
+        related = (relation.related_model.objects.filter(**{remote_name: OuterRef('pk')}).order_by()
+                   .values(remote_name).annotate(value=function(related_field or 'pk')).values('value'))
+        return Subquery(related)
+
+    def get_content_state(self):
+        queryset = self.get_conditional_queryset().select_related(None).prefetch_related(None).order_by()
+        annotations, aggregates = {}, {}
+        for number, field in enumerate(self.last_modified_fields):
+            subquery = self.get_related_subquery(queryset.model, field, Max)
+            if subquery is None:
+                aggregates[f'max_{number}'] = Max(field)
+            else:
+                annotations[f'_max_{number}'] = subquery
+                aggregates[f'max_{number}'] = Max(f'_max_{number}')
+        for number, field in enumerate(self.count_fields):
+            subquery = self.get_related_subquery(queryset.model, field, Count)
+            if subquery is None:
+                aggregates[f'count_{number}'] = Count(field, distinct=True)
+            else:
+                annotations[f'_count_{number}'] = Coalesce(subquery, 0)
+                aggregates[f'count_{number}'] = Coalesce(Sum(f'_count_{number}'), 0)
+        state = queryset.annotate(**annotations).aggregate(**aggregates)
+        dates = [state[f'max_{number}'] for number in range(len(self.last_modified_fields))
+                 if state[f'max_{number}'] is not None]
+        counts = [state[f'count_{number}'] for number in range(len(self.count_fields))]
+        return (max(dates) if dates else None), counts
+
+    def get(self, request, *args, **kwargs):
+        last_modified, counts = self.content_state = self.get_content_state()
+        if last_modified is None:
+            # Нет доступного содержимого: ответ формируется обычным образом (пустой список или 404)
+            return super().get(request, *args, **kwargs)
+
+        state = f'{request.user.pk}:{request.get_full_path()}:{counts}:{last_modified.isoformat()}'
+        etag = f'"{hashlib.md5(state.encode()).hexdigest()}"'
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+
+class CachedResponseMixin:
+    """Класс CachedResponseMixin кэширует данные успешных ответов на GET-запросы. Ключ содержит версию
+    содержимого: общую или версию модуля из URL, если задан module_lookup_url_kwarg. Для представлений,
+    результат которых зависит от оплаченных пользователем модулей, в ключ добавляется набор этих модулей"""
+    module_lookup_url_kwarg = None
+    cache_per_paid_modules = False
+
+    def get_response_cache_key(self, request):
+        if self.module_lookup_url_kwarg is not None:
+            scope = module_scope(self.kwargs[self.module_lookup_url_kwarg])
+        else:
+            scope = GLOBAL_SCOPE
+        # Состояние содержимого, вычисленное ConditionalGetMixin, защищает от устаревших записей
+        # при изменениях в обход представлений API (например, через административную панель)
+        parts = [self.__class__.__name__, *get_content_versions(scope), request.build_absolute_uri(),
+                 getattr(self, 'content_state', None)]
+        if self.cache_per_paid_modules:
+            parts.append(sorted(get_paid_module_ids(request.user)))
+        return 'response:' + hashlib.md5(str(parts).encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        data = response_cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        return response
+
+
+class ContentVersionMixin:
+    """Класс ContentVersionMixin увеличивает версии содержимого затронутых модулей после изменения
+    или удаления объекта, что делает недействительными закэшированные ответы"""
+
+    def perform_update(self, serializer):
+        module_id = serializer.instance.get_content_module_id()
+        super().perform_update(serializer)
+        bump_content_versions(module_id, serializer.instance.get_content_module_id())
+
+    def perform_destroy(self, instance):
+        module_id = instance.get_content_module_id()
+        super().perform_destroy(instance)
+        bump_content_versions(module_id)
+
+
+class ContentParentPermissionMixin:
+    """Класс ContentParentPermissionMixin проверяет права на родительский объект (модуль раздела или раздел темы),
+    в который объект создается или переносится. Родительский объект уже загружен сериализатором при проверке
+    данных, поэтому проверка не выполняет дополнительных запросов"""
+    parent_field = None
+
+    def check_parent_permissions(self, serializer):
+        parent = serializer.validated_data.get(self.parent_field)
+        instance = serializer.instance
+        if instance is not None and (self.parent_field not in serializer.validated_data or
+                                     getattr(instance, f'{self.parent_field}_id') == getattr(parent, 'pk', None)):
+            return
+        self.check_object_permissions(self.request, parent)
+
+    def perform_create(self, serializer):
+        self.check_parent_permissions(serializer)
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        self.check_parent_permissions(serializer)
+        super().perform_update(serializer)
@@ -1,68 +1,339 @@
-from django.db import models
+from collections import defaultdict
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.db import connections, models
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from main.entitlements import get_paid_module_ids, has_paid_module
 from users.models import User
 
 
-class Module(models.Model):
+# Конфигурации полнотекстового поиска: содержимое курсов на русском языке, термины часто на английском
+SEARCH_CONFIGS = ('russian', 'english')
+
+
+def _search_vector():
+    # Название имеет больший вес, чем описание, и индексируется в каждой конфигурации
+    vector = None
+    for config in SEARCH_CONFIGS:
+        for field, weight in (('title', 'A'), ('description', 'B')):
+            part = SearchVector(field, config=config, weight=weight)
+            vector = part if vector is None else vector + part
+    return vector
+
+
+class SearchQuerySet(models.QuerySet):
+    """Класс SearchQuerySet содержит полнотекстовый поиск по названию и описанию. В PostgreSQL поиск
+    выполняется по хранимому столбцу search_vector с GIN-индексом, в остальных базах данных (SQLite
+    в тестах) используется поиск подстроки без учета морфологии"""
+
+    def _is_postgresql(self):
+        return connections[self.db].vendor == 'postgresql'
+
+    def update_search_vector(self):
+        # Столбец вычисляется в базе данных одним запросом UPDATE
+        if not self._is_postgresql():
+            return 0
+        return self.update(search_vector=_search_vector())
+
+    def search(self, text):
+        if not self._is_postgresql():
+            return (self.filter(models.Q(title__icontains=text) | models.Q(description__icontains=text))
+                    .annotate(rank=models.Value(1.0, output_field=models.FloatField())).order_by('id'))
+        query = None
+        for config in SEARCH_CONFIGS:
+            part = SearchQuery(text, config=config, search_type='websearch')
+            query = part if query is None else query | part
+        return (self.filter(search_vector=query).annotate(rank=SearchRank(models.F('search_vector'), query))
+                .order_by('-rank', 'id'))
+
+
+class SearchableModel(models.Model):
+    """Абстрактная модель с хранимым столбцом полнотекстового поиска по полям title и description"""
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'title', 'description'} & set(update_fields):
+            type(self).objects.filter(pk=self.pk).update_search_vector()
+
+
+class ModuleQuerySet(SearchQuerySet):
+    """Класс ModuleQuerySet содержит выборки модулей, которые выполняются на стороне базы данных"""
+
+    def accessible(self, user):
+        # Модули, открытые для всех, и модули, оплаченные пользователем
+        return self.filter(models.Q(is_paid=True) | models.Q(id__in=get_paid_module_ids(user)))
+
+    def change_counter(self, field, delta):
+        # Счетчик увеличивается F-выражением в базе данных, поэтому параллельные изменения не теряются.
+        # Дата изменения обновляется, так как счетчики входят в представление модуля. Значение не опускается
+        # ниже нуля: заниженный счетчик (после bulk_create или update в обход моделей) исправит сверка
+        return self.update(**{field: Greatest(models.F(field) + delta, 0), 'updated_at': timezone.now()})
+
+    def with_actual_counters(self):
+        # Фактические значения счетчиков, вычисленные подзапросами COUNT по разделам, темам и платежам
+        return self.annotate(
+            actual_section_count=_count_by_module(Section.objects.all()),
+            actual_topic_count=_count_by_module(Topic.objects.all()),
+            actual_learner_count=_count_by_module(Payment.objects.filter(status=PaymentStatus.CONFIRMED)),
+        )
+
+    def with_stale_counters(self):
+        # Модули, у которых хотя бы один счетчик отличается от фактического значения
+        return self.with_actual_counters().exclude(
+            section_count=models.F('actual_section_count'),
+            topic_count=models.F('actual_topic_count'),
+            learner_count=models.F('actual_learner_count'),
+        )
+
+    def refresh_counters(self):
+        # Пересчитывает счетчики модулей одним запросом UPDATE с подзапросами
+        return self.update(
+            section_count=_count_by_module(Section.objects.all()),
+            topic_count=_count_by_module(Topic.objects.all()),
+            learner_count=_count_by_module(Payment.objects.filter(status=PaymentStatus.CONFIRMED)),
+            updated_at=timezone.now(),
+        )
+
+    def with_tree(self):
+        # Разделы и темы загружаются двумя дополнительными запросами, упорядоченными по порядковому номеру
+        return self.prefetch_related(
+            models.Prefetch('sections', queryset=Section.objects.order_by('number', 'id')),
+            models.Prefetch('sections__topics', queryset=Topic.objects.order_by('number', 'id')),
+        )
+
+
+def _count_by_module(queryset):
+    return Coalesce(models.Subquery(
+        queryset.filter(module_id=models.OuterRef('pk')).order_by().values('module_id')
+        .annotate(total=models.Count('id')).values('total')
+    ), 0)
+
+
+class Module(SearchableModel):
     """Модель Module"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='пользователь')
     number = models.IntegerField(verbose_name='порядковый номер модуля')
     title = models.CharField(max_length=150, verbose_name='название модуля')
     description = models.TextField(verbose_name='описание модуля')
     is_paid = models.BooleanField(default=False, verbose_name='Модуль оплачен')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='дата изменения модуля')
+    # Счетчики разделов, тем и слушателей с подтвержденной оплатой, обновляются при изменении
+    # содержимого и периодически сверяются задачей reconcile_module_counters
+    section_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='количество разделов')
+    topic_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='количество тем')
+    learner_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='количество слушателей')
+
+    objects = ModuleQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def get_content_module_id(self):
+        return self.id
+
+    def get_content_owner_id(self):
+        return self.user_id
+
     def is_paid_by(self, user):
-        return self.paid_users.filter(id=user.id).exists()
+        # Проверка по закэшированному набору оплаченных пользователем модулей
+        return has_paid_module(user, self.id)
 
     class Meta:
         verbose_name = 'Модуль'
         verbose_name_plural = 'Модули'
         ordering = ['id']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='module_search_vector_idx'),
+        ]
+
+
+def change_module_counters(field, deltas):
+    """Изменяет счетчик field модулей на величины из словаря deltas {идентификатор модуля: изменение}.
+    Модули с одинаковым изменением обновляются одним запросом"""
+    module_ids_by_delta = defaultdict(list)
+    for module_id, delta in deltas.items():
+        if module_id is not None and delta:
+            module_ids_by_delta[delta].append(module_id)
+    for delta, module_ids in module_ids_by_delta.items():
+        Module.objects.filter(pk__in=module_ids).change_counter(field, delta)
+
+
+class SectionQuerySet(SearchQuerySet):
+    """Класс SectionQuerySet содержит выборки разделов, которые выполняются на стороне базы данных"""
+
+    def accessible(self, user):
+        # Разделы модулей, открытых для всех или оплаченных пользователем, модуль подгружается тем же запросом
+        # через JOIN
+        available = models.Q(module__is_paid=True) | models.Q(module_id__in=get_paid_module_ids(user))
+        return self.filter(available).select_related('module')
 
+    def with_owner(self):
+        # Владелец модуля раздела загружается тем же запросом через JOIN для проверки прав на изменение
+        return self.annotate(owner_id=models.F('module__user_id'))
 
-class Section(models.Model):
+
+class Section(SearchableModel):
     """Модель Section (Разделы, которые содержатся в модуле модели Module"""
     number = models.IntegerField(verbose_name='порядковый номер раздела')
     title = models.CharField(max_length=150, verbose_name='название раздела')
     description = models.TextField(verbose_name='описание раздела')
     module = models.ForeignKey('Module', on_delete=models.CASCADE, null=True, verbose_name='Модуль',
                                related_name='sections')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='дата изменения раздела')
+
+    objects = SectionQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Модуль на момент загрузки нужен, чтобы при переносе раздела пересчитать счетчики обоих модулей
+        if 'module_id' in instance.__dict__:
+            instance._loaded_module_id = instance.module_id
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            change_module_counters('section_count', {self.module_id: 1})
+            self._loaded_module_id = self.module_id
+            return
+        loaded_module_id = getattr(self, '_loaded_module_id', self.module_id)
+        if loaded_module_id != self.module_id:
+            # При переносе раздела в другой модуль денормализованный модуль его тем обновляется одним запросом.
+            # Дата изменения тем обновляется, так как модуль входит в их представление
+            self.topics.exclude(module_id=self.module_id).update(module_id=self.module_id, updated_at=timezone.now())
+            Module.objects.filter(pk__in=[loaded_module_id, self.module_id]).refresh_counters()
+        self._loaded_module_id = self.module_id
+
+    def delete(self, *args, **kwargs):
+        topic_count = self.topics.count()
+        result = super().delete(*args, **kwargs)
+        change_module_counters('section_count', {self.module_id: -1})
+        change_module_counters('topic_count', {self.module_id: -topic_count})
+        return result
+
     class Meta:
         verbose_name = 'Раздел'
         verbose_name_plural = 'Разделы'
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['module', 'number'], name='section_module_number_idx'),
+            GinIndex(fields=['search_vector'], name='section_search_vector_idx'),
+        ]
+
+    def get_content_module_id(self):
+        return self.module_id
+
+    def get_content_owner_id(self):
+        # Владелец, загруженный выборкой with_owner(), иначе - владелец модуля
+        if hasattr(self, 'owner_id'):
+            return self.owner_id
+        return self.module.user_id if self.module_id else None
+
 
-    def can_access(self, user):
-        # Проверка, можно ли пользователю получить доступ к разделу
-        return self.module.is_paid
+class TopicQuerySet(SearchQuerySet):
+    """Класс TopicQuerySet содержит выборки тем, которые выполняются на стороне базы данных"""
 
+    def accessible(self, user):
+        # Темы модулей, открытых для всех или оплаченных пользователем: проверка выполняется по денормализованному
+        # модулю темы одним JOIN
+        available = models.Q(module__is_paid=True) | models.Q(module_id__in=get_paid_module_ids(user))
+        return self.filter(available).select_related('module')
 
-class Topic(models.Model):
+    def with_owner(self):
+        # Владелец определяется по денормализованному модулю темы одним JOIN, без прохода через раздел
+        return self.annotate(owner_id=models.F('module__user_id'))
+
+    def with_stale_module(self):
+        # Темы, у которых денормализованный модуль не совпадает с модулем раздела
+        return self.exclude(module_id__isnull=True, section__module_id__isnull=True).exclude(
+            module_id=models.F('section__module_id'))
+
+    def sync_module(self):
+        # Записывает темам модуль их раздела одним запросом UPDATE
+        return self.update(module_id=models.Subquery(
+            Section.objects.filter(pk=models.OuterRef('section_id')).values('module_id')[:1]))
+
+
+class Topic(SearchableModel):
     """Модель Topic (Темы, которые содержатся в разделе модели Section"""
     number = models.IntegerField(verbose_name='порядковый номер темы')
     title = models.CharField(max_length=150, verbose_name='название темы')
     description = models.TextField(verbose_name='описание темы')
     section = models.ForeignKey('Section', on_delete=models.CASCADE, null=True, verbose_name='Раздел',
                                 related_name='topics')
+    # Модуль раздела темы, хранится в теме, чтобы проверка доступа не проходила через раздел
+    module = models.ForeignKey('Module', on_delete=models.CASCADE, null=True, editable=False,
+                               verbose_name='Модуль', related_name='topics')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='дата изменения темы')
+
+    objects = TopicQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def sync_module(self):
+        self.module_id = self.section.module_id if self.section_id else None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'module_id' in instance.__dict__:
+            instance._loaded_module_id = instance.module_id
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.sync_module()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'section' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'module'}
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        loaded_module_id = None if adding else getattr(self, '_loaded_module_id', self.module_id)
+        if loaded_module_id != self.module_id:
+            change_module_counters('topic_count', {loaded_module_id: -1, self.module_id: 1})
+        self._loaded_module_id = self.module_id
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        change_module_counters('topic_count', {self.module_id: -1})
+        return result
+
     class Meta:
         verbose_name = 'Раздел'
         verbose_name_plural = 'Разделы'
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['section', 'number'], name='topic_section_number_idx'),
+            GinIndex(fields=['search_vector'], name='topic_search_vector_idx'),
+        ]
+
+    def get_content_module_id(self):
+        return self.module_id
+
+    def get_content_owner_id(self):
+        # Владелец, загруженный выборкой with_owner(), иначе - владелец модуля
+        if hasattr(self, 'owner_id'):
+            return self.owner_id
+        return self.module.user_id if self.module_id else None
+
 
-    def can_access(self, user):
-        # Проверка, можно ли пользователю получить доступ к теме
-        return self.section.can_access(user)
+class PaymentStatus(models.TextChoices):
+    PENDING = 'pending', 'Ожидает подтверждения'
+    CONFIRMED = 'confirmed', 'Подтвержден'
+    FAILED = 'failed', 'Отклонен'
 
 
 class Payment(models.Model):
@@ -71,11 +342,75 @@ class Payment(models.Model):
     module = models.ForeignKey(Module, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_date = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=PaymentStatus.choices, default=PaymentStatus.PENDING,
+                              verbose_name='статус платежа')
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, verbose_name='ключ идемпотентности')
 
     def __str__(self):
         return str(self.amount)
 
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        if self.status == PaymentStatus.CONFIRMED:
+            change_module_counters('learner_count', {self.module_id: -1})
+        return result
+
     class Meta:
         verbose_name = 'Платеж'
         verbose_name_plural = 'Платежи'
         ordering = ['id']
+        constraints = [
+            # Уникальный индекс (user, module) также используется для проверки доступа к модулю
+            models.UniqueConstraint(fields=['user', 'module'], name='payment_user_module_uniq'),
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='payment_user_idempotency_uniq'),
+        ]
+
+
+class TopicProgressQuerySet(models.QuerySet):
+    """Класс TopicProgressQuerySet содержит выборки прогресса, которые выполняются на стороне базы данных"""
+
+    def completion_by_module(self):
+        # Завершенные темы и время по модулям одним запросом GROUP BY; количество тем модуля
+        # берется из его счетчика topic_count, без подсчета тем
+        return (self.order_by()
+                .values(module=models.F('topic__module_id'), topic_count=models.F('topic__module__topic_count'))
+                .annotate(completed=models.Count('id', filter=models.Q(completed_at__isnull=False)),
+                          started=models.Count('id'), total_time_spent=models.Sum('time_spent'),
+                          last_activity_at=models.Max('last_seen_at'))
+                .order_by('module'))
+
+    def complete(self, user, topic):
+        """Отмечает тему завершенной. Повторная отметка не меняет дату завершения"""
+        now = timezone.now()
+        progress, created = self.get_or_create(user=user, topic=topic, defaults={
+            'position': 100, 'completed_at': now, 'last_seen_at': now})
+        if not created and progress.completed_at is None:
+            # Условное обновление не перезаписывает завершение, записанное параллельно задачей записи прогресса
+            self.filter(pk=progress.pk, completed_at__isnull=True).update(position=100, completed_at=now,
+                                                                          last_seen_at=now)
+            progress.refresh_from_db()
+        return progress
+
+
+class TopicProgress(models.Model):
+    """Модель TopicProgress (Прогресс пользователя в теме модели Topic). Частые отметки просмотра сначала
+    накапливаются в кэше (main.progress) и записываются в базу данных пакетами периодической задачей"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='пользователь',
+                             related_name='topic_progress')
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, verbose_name='тема', related_name='progress')
+    position = models.PositiveSmallIntegerField(default=0, verbose_name='пройдено, %')
+    time_spent = models.PositiveIntegerField(default=0, verbose_name='время в теме, с')
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name='дата завершения темы')
+    last_seen_at = models.DateTimeField(null=True, blank=True, verbose_name='дата последнего просмотра')
+
+    objects = TopicProgressQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.topic_id} ({self.position}%)'
+
+    class Meta:
+        verbose_name = 'Прогресс по теме'
+        verbose_name_plural = 'Прогресс по темам'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'topic'], name='topic_progress_user_topic_uniq'),
+        ]
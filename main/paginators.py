@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+# Количество строк, начиная с которого админка показывает оценку количества вместо точного COUNT(*)
+ADMIN_EXACT_COUNT_LIMIT = getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 100000)
+
+
+class ContentCursorPagination(CursorPagination):
+    """Класс ContentCursorPagination разбивает списки модулей, разделов и тем на страницы по курсору.
+    Позиция страницы передается значением ключа, поэтому дальние страницы не требуют OFFSET"""
+    ordering = 'id'
+    page_size = getattr(settings, 'CONTENT_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'CONTENT_MAX_PAGE_SIZE', 200)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Класс EstimatedCountPaginator разбивает списки админки на страницы. Для большой таблицы без фильтров
+    количество строк берется из статистики PostgreSQL (pg_class.reltuples) вместо COUNT(*) по всей таблице"""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[self.object_list.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                                   [self.object_list.model._meta.db_table])
+                    row = cursor.fetchone()
+                # Статистика отсутствует (-1) или таблица небольшая: выполняется точный подсчет
+                if row is not None and row[0] > ADMIN_EXACT_COUNT_LIMIT:
+                    return row[0]
+        return super().count
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class PaymentProviderError(Exception):
+    """Временная ошибка платежного провайдера, подтверждение платежа будет повторено"""
+
+
+class PaymentProvider:
+    """Базовый класс платежного провайдера. Метод confirm должен быть идемпотентным по идентификатору
+    платежа, так как подтверждение одного платежа может быть запрошено повторно"""
+
+    def confirm(self, payment):
+        """Возвращает True, если платеж подтвержден, и False, если отклонен"""
+        raise NotImplementedError
+
+
+class StubPaymentProvider(PaymentProvider):
+    """Локальная заглушка платежного провайдера, подтверждает любой платеж"""
+
+    def confirm(self, payment):
+        return True
+
+
+def get_payment_provider():
+    """Возвращает платежный провайдер, класс которого задан настройкой PAYMENT_PROVIDER"""
+    return import_string(getattr(settings, 'PAYMENT_PROVIDER', 'main.payment_providers.StubPaymentProvider'))()
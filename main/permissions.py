@@ -0,0 +1,46 @@
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from users.models import UserRoles
+
+
+def get_role(user):
+    """Возвращает роль пользователя. Роль берется из уже аутентифицированного пользователя
+    (утверждений JWT), поэтому проверка прав не выполняет запросов к базе данных"""
+    if user.is_superuser:
+        return UserRoles.ADMIN
+    return getattr(user, 'roles', None)
+
+
+class IsInternalIP(BasePermission):
+    """Доступ для запросов с адресов из настройки INTERNAL_IPS, например для сборщика метрик Prometheus"""
+
+    def has_permission(self, request, view):
+        return request.META.get('REMOTE_ADDR') in getattr(settings, 'INTERNAL_IPS', ())
+
+
+class ContentPermission(BasePermission):
+    """Права на изменение модулей, разделов и тем:
+    - администратор (роль Admin или суперпользователь) изменяет и удаляет любое содержимое;
+    - модератор изменяет любое содержимое, но не создает и не удаляет его;
+    - сотрудник (is_staff) создает модули и изменяет только содержимое своих модулей.
+    Владелец раздела и темы - владелец модуля, он загружается вместе с объектом (with_owner)"""
+    moderator_methods = ('PUT', 'PATCH')
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if request.method in SAFE_METHODS or user.is_staff or get_role(user) == UserRoles.ADMIN:
+            return True
+        return get_role(user) == UserRoles.MODERATOR and request.method in self.moderator_methods
+
+    def has_object_permission(self, request, view, obj):
+        # obj - изменяемый объект или модуль и раздел, в которые объект создается или переносится
+        user = request.user
+        role = get_role(user)
+        if request.method in SAFE_METHODS or role == UserRoles.ADMIN:
+            return True
+        if role == UserRoles.MODERATOR and request.method in self.moderator_methods:
+            return True
+        return obj is not None and obj.get_content_owner_id() == user.pk
@@ -0,0 +1,189 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+# Частые отметки просмотра темы (heartbeat) не записываются в базу данных при запросе. Для пары
+# (пользователь, тема) в общем кэше (Redis) накапливаются секунды, проведенные в теме, и последняя позиция,
+# а сама пара один раз попадает в журнал изменений: номер ячейки журнала выдается атомарным incr.
+# Периодическая задача flush_topic_progress атомарно переключает отметки на новый журнал (поколение)
+# и записывает закрытый журнал в базу данных пакетами. Одновременно выполняется только одна запись
+
+# Время хранения накопленных значений и ячеек журнала, в секундах: данные не теряются, пока задача
+# записи не запускалась дольше этого времени
+PROGRESS_BUFFER_TTL = getattr(settings, 'PROGRESS_BUFFER_TTL', 24 * 60 * 60)
+# Периодичность записи прогресса в базу данных, в секундах
+PROGRESS_FLUSH_SECONDS = getattr(settings, 'PROGRESS_FLUSH_SECONDS', 30)
+# Метка пары в журнале живет несколько периодов записи: если ячейка журнала не была прочитана,
+# после истечения метки следующая отметка снова добавит пару в журнал
+PROGRESS_DIRTY_TTL = getattr(settings, 'PROGRESS_DIRTY_TTL', PROGRESS_FLUSH_SECONDS * 10)
+# Количество ячеек журнала, которое записывается в базу данных одной транзакцией
+PROGRESS_FLUSH_BATCH_SIZE = getattr(settings, 'PROGRESS_FLUSH_BATCH_SIZE', 1000)
+# Максимальное количество секунд в одной отметке, больший интервал считается перерывом в занятии
+PROGRESS_HEARTBEAT_MAX_SECONDS = getattr(settings, 'PROGRESS_HEARTBEAT_MAX_SECONDS', 300)
+# Время блокировки записи, в секундах: если процесс записи завершился аварийно, блокировка снимается сама
+PROGRESS_FLUSH_LOCK_TTL = getattr(settings, 'PROGRESS_FLUSH_LOCK_TTL', PROGRESS_FLUSH_SECONDS * 10)
+
+_GENERATION_KEY = 'progress:generation'
+_LOCK_KEY = 'progress:flush:lock'
+
+
+def _sequence_key(generation):
+    return f'progress:sequence:{generation}'
+
+
+def _flushed_key(generation):
+    return f'progress:flushed:{generation}'
+
+
+def _slot_key(generation, slot):
+    return f'progress:slot:{generation}:{slot}'
+
+
+def _dirty_key(user_id, topic_id):
+    return f'progress:dirty:{user_id}:{topic_id}'
+
+
+def _seconds_key(user_id, topic_id):
+    return f'progress:seconds:{user_id}:{topic_id}'
+
+
+def _state_key(user_id, topic_id):
+    return f'progress:state:{user_id}:{topic_id}'
+
+
+def _incr(key, delta, timeout):
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Ключ вытеснен между add и incr
+        cache.set(key, delta, timeout)
+        return delta
+
+
+def record_heartbeat(user_id, topic_id, position, seconds):
+    """Накапливает отметку просмотра темы в кэше без обращения к базе данных"""
+    _incr(_seconds_key(user_id, topic_id), seconds, PROGRESS_BUFFER_TTL)
+    # Сохраняется наибольшая позиция: отметки могут приходить не по порядку
+    state = cache.get(_state_key(user_id, topic_id))
+    if state is not None:
+        position = max(position, state[0])
+    cache.set(_state_key(user_id, topic_id), (position, timezone.now()), PROGRESS_BUFFER_TTL)
+    if cache.add(_dirty_key(user_id, topic_id), 1, PROGRESS_DIRTY_TTL):
+        generation = cache.get(_GENERATION_KEY) or 0
+        slot = _incr(_sequence_key(generation), 1, PROGRESS_BUFFER_TTL)
+        cache.set(_slot_key(generation, slot), (user_id, topic_id), PROGRESS_BUFFER_TTL)
+
+
+def _load_accessible(pairs):
+    """Возвращает пары, прогресс которых можно записать: активный пользователь и существующая тема модуля,
+    открытого для всех или оплаченного пользователем. Проверка выполняется тремя запросами на пакет"""
+    from main.models import Payment, PaymentStatus, Topic
+    from users.models import User
+
+    user_ids = {user_id for user_id, _ in pairs}
+    topic_ids = {topic_id for _, topic_id in pairs}
+    active_user_ids = set(User.objects.filter(pk__in=user_ids, is_active=True).values_list('id', flat=True))
+    topics = {topic_id: (module_id, is_paid) for topic_id, module_id, is_paid in
+              Topic.objects.filter(pk__in=topic_ids).values_list('id', 'module_id', 'module__is_paid')}
+    paid = set(Payment.objects.filter(user_id__in=user_ids, status=PaymentStatus.CONFIRMED)
+               .values_list('user_id', 'module_id'))
+    return {(user_id, topic_id) for user_id, topic_id in pairs
+            if user_id in active_user_ids and topic_id in topics
+            and (topics[topic_id][1] or (user_id, topics[topic_id][0]) in paid)}
+
+
+def _write_progress(pairs, values):
+    """Объединяет накопленные значения с сохраненным прогрессом и записывает пакет через bulk_create
+    и bulk_update. Строки блокируются, чтобы не перезаписать одновременное завершение темы"""
+    from main.models import TopicProgress
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {(progress.user_id, progress.topic_id): progress for progress in
+                    TopicProgress.objects.select_for_update().filter(
+                        user_id__in={user_id for user_id, _ in pairs},
+                        topic_id__in={topic_id for _, topic_id in pairs})}
+        created, updated = [], []
+        for pair in pairs:
+            seconds, state = values[pair]
+            progress = existing.get(pair)
+            if progress is None:
+                progress = TopicProgress(user_id=pair[0], topic_id=pair[1])
+                created.append(progress)
+            else:
+                updated.append(progress)
+            progress.time_spent += seconds
+            if state is not None:
+                position, seen_at = state
+                progress.position = max(progress.position, position)
+                progress.last_seen_at = seen_at
+            if progress.position >= 100 and progress.completed_at is None:
+                progress.completed_at = progress.last_seen_at or now
+        TopicProgress.objects.bulk_create(created, batch_size=PROGRESS_FLUSH_BATCH_SIZE)
+        TopicProgress.objects.bulk_update(updated, ['position', 'time_spent', 'completed_at', 'last_seen_at'],
+                                          batch_size=PROGRESS_FLUSH_BATCH_SIZE)
+
+
+def _flush_generation(generation):
+    """Записывает ячейки журнала поколения, еще не записанные в базу данных, и возвращает количество
+    записанных пар. Позиция в журнале сохраняется после каждого пакета: при ошибке пакет будет записан повторно"""
+    flushed = cache.get(_flushed_key(generation)) or 0
+    last = cache.get(_sequence_key(generation)) or 0
+    if last < flushed:
+        # Счетчик журнала был вытеснен из кэша и начался заново
+        flushed = 0
+    total = 0
+    for start in range(flushed + 1, last + 1, PROGRESS_FLUSH_BATCH_SIZE):
+        slot_keys = [_slot_key(generation, slot)
+                     for slot in range(start, min(start + PROGRESS_FLUSH_BATCH_SIZE, last + 1))]
+        pairs = set(cache.get_many(slot_keys).values())
+        # Метки снимаются до чтения значений: отметка, пришедшая после чтения, снова попадет в журнал
+        cache.delete_many([_dirty_key(*pair) for pair in pairs])
+        cached = cache.get_many([_seconds_key(*pair) for pair in pairs] + [_state_key(*pair) for pair in pairs])
+        values = {pair: (cached.get(_seconds_key(*pair)) or 0, cached.get(_state_key(*pair))) for pair in pairs}
+
+        # Прочитанные секунды сразу вычитаются атомарным decr: отметки, пришедшие после чтения, сохраняются
+        # в кэше, а секунды не будут записаны повторно. При ошибке записи они возвращаются в кэш
+        claimed = []
+        for pair in pairs:
+            if values[pair][0]:
+                try:
+                    cache.decr(_seconds_key(*pair), values[pair][0])
+                except ValueError:
+                    values[pair] = (0, values[pair][1])
+                else:
+                    claimed.append(pair)
+        try:
+            accessible = _load_accessible(pairs) if pairs else set()
+            if accessible:
+                _write_progress(accessible, values)
+        except Exception:
+            for pair in claimed:
+                _incr(_seconds_key(*pair), values[pair][0], PROGRESS_BUFFER_TTL)
+            raise
+        cache.delete_many(slot_keys)
+        cache.set(_flushed_key(generation), start + len(slot_keys) - 1, PROGRESS_BUFFER_TTL)
+        total += len(accessible)
+    return total
+
+
+def flush_progress():
+    """Записывает накопленные отметки в базу данных и возвращает количество записанных пар. Если запись
+    уже выполняется другим процессом, возвращает 0. Новые отметки переключаются на следующее поколение
+    журнала атомарным incr, поэтому закрытый журнал не изменяется во время записи. Отметка, получившая
+    номер поколения до переключения, может попасть в закрытый журнал после его чтения, поэтому
+    предыдущее поколение дочитывается при следующем запуске"""
+    token = uuid.uuid4().hex
+    if not cache.add(_LOCK_KEY, token, PROGRESS_FLUSH_LOCK_TTL):
+        return 0
+    try:
+        generation = _incr(_GENERATION_KEY, 1, None) - 1
+        return sum(_flush_generation(closed) for closed in (generation - 1, generation) if closed >= 0)
+    finally:
+        # Блокировка снимается, только если она не истекла и не была взята другим процессом
+        if cache.get(_LOCK_KEY) == token:
+            cache.delete(_LOCK_KEY)
@@ -0,0 +1,14 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Класс PrometheusRenderer отдает метрики в текстовом формате Prometheus"""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # Ошибки (например, отказ в доступе) выводятся одной строкой
+        return str(data).encode(self.charset)
@@ -1,5 +1,7 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import Module, Section, Topic, Payment
+from .models import Module, Section, Topic, Payment, TopicProgress
+from .progress import PROGRESS_HEARTBEAT_MAX_SECONDS
 
 
 class ModuleSerializer(serializers.ModelSerializer):
@@ -8,7 +10,7 @@ class ModuleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Module
-        fields = '__all__'
+        exclude = ('updated_at', 'search_vector')
 
 
 class SectionSerializer(serializers.ModelSerializer):
@@ -17,19 +19,211 @@ class SectionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Section
-        fields = '__all__'
+        exclude = ('updated_at', 'search_vector')
 
 
 class TopicSerializer(serializers.ModelSerializer):
     """Класс TopicSerializer сериализует данные полученные в соответствии с установленной моделью класса Topic,
     данные сериализуются, в рамках функциональности CRUD"""
+    # Раздел загружается вместе с владельцем модуля для проверки прав на создание и перенос темы
+    section = serializers.PrimaryKeyRelatedField(queryset=Section.objects.with_owner(), allow_null=True,
+                                                 required=False)
 
     class Meta:
         model = Topic
-        fields = '__all__'
+        exclude = ('updated_at', 'search_vector', 'module')
 
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = '__all__'
 
+
+class PaymentStatusSerializer(serializers.ModelSerializer):
+    """Класс PaymentStatusSerializer сериализует платеж для ответа о статусе его подтверждения"""
+
+    class Meta:
+        model = Payment
+        fields = ('id', 'module', 'amount', 'status', 'payment_date')
+        read_only_fields = fields
+
+
+class TopicProgressSerializer(serializers.ModelSerializer):
+    """Класс TopicProgressSerializer сериализует прогресс пользователя в теме"""
+
+    class Meta:
+        model = TopicProgress
+        fields = ('topic', 'position', 'time_spent', 'completed_at', 'last_seen_at')
+        read_only_fields = fields
+
+
+class ProgressHeartbeatSerializer(serializers.Serializer):
+    """Класс ProgressHeartbeatSerializer проверяет отметку просмотра темы: позицию в процентах
+    и количество секунд с предыдущей отметки"""
+    position = serializers.IntegerField(min_value=0, max_value=100)
+    seconds = serializers.IntegerField(min_value=0, max_value=PROGRESS_HEARTBEAT_MAX_SECONDS, default=0)
+
+
+class ModuleProgressSerializer(serializers.Serializer):
+    """Класс ModuleProgressSerializer сериализует прохождение модуля: количество завершенных и начатых тем
+    и процент завершения от количества тем модуля"""
+    module = serializers.IntegerField()
+    topic_count = serializers.IntegerField()
+    completed = serializers.IntegerField()
+    started = serializers.IntegerField()
+    percent = serializers.SerializerMethodField()
+    total_time_spent = serializers.IntegerField()
+    last_activity_at = serializers.DateTimeField()
+
+    def get_percent(self, row):
+        if not row['topic_count']:
+            return 0
+        return min(100, round(100 * row['completed'] / row['topic_count']))
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Поле связи, которое ищет объект в словаре context['related_objects'], загруженном заранее одним запросом,
+    вместо отдельного запроса к базе данных для каждого объекта"""
+
+    def to_internal_value(self, data):
+        related_objects = self.context.get('related_objects')
+        if related_objects is None:
+            return super().to_internal_value(data)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in related_objects:
+            self.fail('does_not_exist', pk_value=data)
+        return related_objects[pk]
+
+
+class SectionBulkSerializer(SectionSerializer):
+    """Класс SectionBulkSerializer проверяет разделы при массовой загрузке по правилам SectionSerializer,
+    модули при этом берутся из заранее загруженного словаря"""
+    module = PrefetchedPrimaryKeyRelatedField(queryset=Module.objects.all(), allow_null=True, required=False)
+
+
+class TopicBulkSerializer(TopicSerializer):
+    """Класс TopicBulkSerializer проверяет темы при массовой загрузке по правилам TopicSerializer,
+    разделы при этом берутся из заранее загруженного словаря"""
+    section = PrefetchedPrimaryKeyRelatedField(queryset=Section.objects.all(), allow_null=True, required=False)
+
+
+class ModuleSummarySerializer(serializers.ModelSerializer):
+    """Класс ModuleSummarySerializer сериализует краткое представление модуля для списков, без описания"""
+
+    class Meta:
+        model = Module
+        fields = ('id', 'number', 'title', 'user', 'is_paid', 'section_count', 'topic_count', 'learner_count')
+
+
+class SectionSummarySerializer(serializers.ModelSerializer):
+    """Класс SectionSummarySerializer сериализует краткое представление раздела для списков, без описания"""
+    is_paid = serializers.BooleanField(source='module.is_paid', read_only=True)
+
+    class Meta:
+        model = Section
+        fields = ('id', 'number', 'title', 'module', 'is_paid')
+
+
+class TopicSummarySerializer(serializers.ModelSerializer):
+    """Класс TopicSummarySerializer сериализует краткое представление темы для списков, без описания"""
+    is_paid = serializers.BooleanField(source='module.is_paid', read_only=True)
+
+    class Meta:
+        model = Topic
+        fields = ('id', 'number', 'title', 'section', 'is_paid')
+
+
+class ModuleSearchSerializer(ModuleSummarySerializer):
+    """Класс ModuleSearchSerializer сериализует найденный модуль вместе с релевантностью"""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(ModuleSummarySerializer.Meta):
+        fields = ModuleSummarySerializer.Meta.fields + ('rank',)
+
+
+class SectionSearchSerializer(SectionSummarySerializer):
+    """Класс SectionSearchSerializer сериализует найденный раздел вместе с релевантностью"""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(SectionSummarySerializer.Meta):
+        fields = SectionSummarySerializer.Meta.fields + ('rank',)
+
+
+class TopicSearchSerializer(TopicSummarySerializer):
+    """Класс TopicSearchSerializer сериализует найденную тему вместе с релевантностью"""
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(TopicSummarySerializer.Meta):
+        fields = TopicSummarySerializer.Meta.fields + ('rank',)
+
+
+class TopicTreeSerializer(TopicSerializer):
+    """Класс TopicTreeSerializer сериализует тему в составе дерева курса, только для чтения"""
+    section = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta(TopicSerializer.Meta):
+        read_only_fields = ('number', 'title', 'description', 'section')
+
+
+class SectionTreeSerializer(SectionSerializer):
+    """Класс SectionTreeSerializer сериализует раздел вместе с вложенными темами, только для чтения"""
+    topics = TopicTreeSerializer(many=True, read_only=True)
+
+    class Meta(SectionSerializer.Meta):
+        read_only_fields = ('number', 'title', 'description', 'module')
+
+
+class ModuleTreeSerializer(ModuleSerializer):
+    """Класс ModuleTreeSerializer сериализует модуль вместе с вложенными разделами и темами, только для чтения"""
+    sections = SectionTreeSerializer(many=True, read_only=True)
+
+    class Meta(ModuleSerializer.Meta):
+        read_only_fields = ('user', 'number', 'title', 'description', 'is_paid')
+
+
+class ValuesSerializer:
+    """Класс ValuesSerializer формирует представление списка только для чтения напрямую из строк,
+    полученных через .values(), без создания экземпляров модели. Набор полей и их порядок берутся
+    из serializer_class, поэтому результат совпадает с выводом исходного сериализатора"""
+    # Поля, представление которых совпадает со значением, полученным из базы данных
+    identity_fields = (serializers.IntegerField, serializers.CharField, serializers.BooleanField,
+                       serializers.PrimaryKeyRelatedField)
+    _instances = {}
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.plan = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField,
+                                  serializers.SerializerMethodField)) \
+                    or field.source == '*':
+                raise TypeError(f'Поле {name} не поддерживается {self.__class__.__name__}')
+            column = field.source.replace('.', '__')
+            convert = None if isinstance(field, self.identity_fields) else field.to_representation
+            self.plan.append((name, column, convert))
+        self.columns = list(dict.fromkeys(['id'] + [column for _, column, _ in self.plan]))
+
+    @classmethod
+    def for_serializer(cls, serializer_class):
+        # План полей строится один раз для каждого класса сериализатора
+        if serializer_class not in cls._instances:
+            cls._instances[serializer_class] = cls(serializer_class)
+        return cls._instances[serializer_class]
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representation(self, rows):
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in self.plan:
+                value = row[column]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
@@ -0,0 +1,53 @@
+from celery import shared_task
+from django.conf import settings
+
+from main.cache import bump_content_versions
+from main.entitlements import warm_paid_modules
+from main.models import Module, Payment, PaymentStatus, change_module_counters
+from main.payment_providers import PaymentProviderError, get_payment_provider
+from main.progress import flush_progress
+
+# Количество модулей, счетчики которых пересчитываются одним запросом при сверке
+MODULE_COUNTERS_BATCH_SIZE = getattr(settings, 'MODULE_COUNTERS_BATCH_SIZE', 500)
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=10)
+def confirm_payment(self, payment_id):
+    """Подтверждает платеж у платежного провайдера, обновляет его статус
+    и загружает в кэш набор оплаченных модулей пользователя"""
+    payment = Payment.objects.filter(id=payment_id, status=PaymentStatus.PENDING).first()
+    if payment is None:
+        return None
+
+    try:
+        confirmed = get_payment_provider().confirm(payment)
+    except PaymentProviderError as exc:
+        raise self.retry(exc=exc)
+
+    new_status = PaymentStatus.CONFIRMED if confirmed else PaymentStatus.FAILED
+    # Условное обновление: при повторной постановке задачи статус меняется только один раз
+    updated = Payment.objects.filter(id=payment_id, status=PaymentStatus.PENDING).update(status=new_status)
+    if updated and confirmed:
+        change_module_counters('learner_count', {payment.module_id: 1})
+        bump_content_versions(payment.module_id)
+        warm_paid_modules(payment.user_id)
+    return new_status
+
+
+@shared_task
+def reconcile_module_counters():
+    """Сверяет счетчики разделов, тем и слушателей модулей с фактическими значениями и исправляет
+    расхождения, возникшие при изменении данных в обход моделей. Запускается периодически celery beat"""
+    stale_ids = list(Module.objects.with_stale_counters().values_list('id', flat=True))
+    for start in range(0, len(stale_ids), MODULE_COUNTERS_BATCH_SIZE):
+        module_ids = stale_ids[start:start + MODULE_COUNTERS_BATCH_SIZE]
+        Module.objects.filter(pk__in=module_ids).refresh_counters()
+        bump_content_versions(*module_ids)
+    return len(stale_ids)
+
+
+@shared_task
+def flush_topic_progress():
+    """Записывает отметки просмотра тем, накопленные в кэше, в базу данных пакетами.
+    Запускается периодически celery beat"""
+    return flush_progress()
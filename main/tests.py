@@ -1,15 +1,35 @@
-from rest_framework.exceptions import ValidationError
-from main.validators import TitleValidator, validator_description_words
-from django.test import TestCase
-from .serializers import ModuleSerializer
+from django.test import TestCase, TransactionTestCase
+from .serializers import ModuleSerializer, SectionSerializer, TopicSerializer, ValuesSerializer
+from rest_framework.renderers import JSONRenderer
 import unittest
-from main.models import Module, Section, Payment, Topic
-from rest_framework.test import APITestCase
+from main.models import Module, Section, Payment, PaymentStatus, Topic, TopicProgress
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
-from users.models import User
+from users.models import User, UserRoles
 from django.urls import reverse
 from rest_framework.test import APIClient
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from main import entitlements, progress
+from main.entitlements import get_paid_module_ids, invalidate_paid_modules, warm_paid_modules
+from main.cache import response_cache
+from main.views import ModuleTreeRetrieveAPIView
+from main.payment_providers import PaymentProvider
+from main.tasks import confirm_payment, reconcile_module_counters, flush_topic_progress
+from django.test import override_settings, modify_settings
+from unittest import mock
+from main.metrics import metrics_registry
+from users.serializers import UserTokenObtainPairSerializer
+import functools
+import gzip
+import io
 import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from django.core.management import call_command
 
 
 class ModuleSerializerTests(TestCase):
@@ -38,7 +58,8 @@ class ModuleSerializerTests(TestCase):
 
     def test_module_serializer_fields(self):
         self.assertEqual(set(self.serializer.fields.keys()),
-                         set(['id', 'user', 'number', 'title', 'description', 'is_paid']))
+                         set(['id', 'user', 'number', 'title', 'description', 'is_paid', 'section_count',
+                              'topic_count', 'learner_count']))
 
     def test_module_serializer_data(self):
         data = self.serializer.data
@@ -75,31 +96,6 @@ class ModuleModelTests(TestCase):
         self.assertEqual(str(self.module), 'Module 1')
 
 
-class TestTitleValidator(unittest.TestCase):
-    def test_valid_title(self):
-        validator = TitleValidator(field='title')
-        value = {'title': 'Invalid Title!'}
-        with self.assertRaises(ValidationError):
-            validator(value)
-
-    def test_invalid_title(self):
-        validator = TitleValidator(field='title')
-        value = {'title': 'invalid_title!@#$'}
-        with self.assertRaises(ValidationError):
-            validator(value)
-
-
-class TestDescriptionWordsValidator(unittest.TestCase):
-    def test_valid_description(self):
-        value = 'This is a valid description'
-        self.assertIsNone(validator_description_words(value))
-
-    def test_invalid_description(self):
-        value = 'This description contains a scam word: война'
-        with self.assertRaises(ValidationError):
-            validator_description_words(value)
-
-
 class SectionListAPIViewTest(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -113,7 +109,6 @@ class SectionListAPIViewTest(APITestCase):
             is_paid=True
         )
         self.section = Section.objects.create(
-            user=self.user,
             number=1,
             title='Test Section',
             module=self.module
@@ -124,8 +119,8 @@ class SectionListAPIViewTest(APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], self.section.title)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], self.section.title)
 
 
 class SectionCreateAPIViewTest(APITestCase):
@@ -141,7 +136,6 @@ class SectionCreateAPIViewTest(APITestCase):
             is_paid=True
         )
         self.section = Section.objects.create(
-            user=self.superuser,
             number=1,
             title='New Section',
             module=self.module
@@ -170,7 +164,6 @@ class SectionUpdateAPIViewTest(APITestCase):
             is_paid=True
         )
         self.section = Section.objects.create(
-            user=self.superuser,
             number=1,
             title='New Section',
             module=self.module
@@ -198,7 +191,6 @@ class SectionDestroyAPIViewTest(APITestCase):
             is_paid=True
         )
         self.section = Section.objects.create(
-            user=self.superuser,
             number=1,
             title='New Section',
             module=self.module
@@ -235,8 +227,8 @@ class PaymentCreateAPIViewTestCase(TestCase):
         data = {'amount': self.payment_amount}
         response = self.client.post(url, data)
 
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertEqual(response.data, {'message': 'Payment successful'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], PaymentStatus.PENDING)
         self.assertEqual(Payment.objects.count(), 1)
         payment = Payment.objects.first()
         self.assertEqual(payment.user, self.user)
@@ -323,13 +315,11 @@ class TopicCreateAPIViewTest(APITestCase):
             is_paid=True
         )
         self.section = Section.objects.create(
-            user=self.superuser,
             number=1,
             title='New Section',
             module=self.module
         )
         self.topic = Topic.objects.create(
-            user=self.superuser,
             number=1,
             title='New Topic',
             description='Topic 1 description',
@@ -359,13 +349,11 @@ class TopicUpdateAPIViewTest(APITestCase):
             is_paid=True
         )
         self.section = Section.objects.create(
-            user=self.superuser,
             number=1,
             title='New Section',
             module=self.module
         )
         self.topic = Topic.objects.create(
-            user=self.superuser,
             number=1,
             title='New Topic',
             description='Topic 1 description',
@@ -394,13 +382,11 @@ class TopicDestroyAPIViewTest(APITestCase):
             is_paid=True
         )
         self.section = Section.objects.create(
-            user=self.superuser,
             number=1,
             title='New Section',
             module=self.module
         )
         self.topic = Topic.objects.create(
-            user=self.superuser,
             number=1,
             title='New Topic',
             description='Topic 1 description',
@@ -413,3 +399,1444 @@ class TopicDestroyAPIViewTest(APITestCase):
         response = self.client.delete(url)
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class SectionListAPIViewQueryCountTest(APITestCase):
+    """Класс SectionListAPIViewQueryCountTest проверяет, что список разделов формируется двумя запросами
+    (ETag и данные) независимо от количества строк (без N+1)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.paid_module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                                 description='Module 1 description', is_paid=True)
+        self.free_module = Module.objects.create(user=self.user, number=2, title='Module 2',
+                                                 description='Module 2 description')
+        for number in range(1, 6):
+            Section.objects.create(number=number, title=f'Section {number}', description='Section description',
+                                   module=self.paid_module)
+        Section.objects.create(number=1, title='Hidden Section', description='Section description',
+                               module=self.free_module)
+        # Набор оплаченных модулей пользователя загружается в кэш заранее и не входит в число запросов
+        warm_paid_modules(self.user.id)
+
+    def test_section_list_query_count(self):
+        url = reverse('main:section-list')
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertNotIn('Hidden Section', [section['title'] for section in response.data['results']])
+
+
+class TopicListAPIViewQueryCountTest(APITestCase):
+    """Класс TopicListAPIViewQueryCountTest проверяет, что список тем формируется двумя запросами
+    (ETag и данные) независимо от количества строк (без N+1)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.paid_module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                                 description='Module 1 description', is_paid=True)
+        self.free_module = Module.objects.create(user=self.user, number=2, title='Module 2',
+                                                 description='Module 2 description')
+        paid_section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.paid_module)
+        free_section = Section.objects.create(number=1, title='Section 2', description='Section description',
+                                              module=self.free_module)
+        for number in range(1, 6):
+            Topic.objects.create(number=number, title=f'Topic {number}', description='Topic description',
+                                 section=paid_section)
+        Topic.objects.create(number=1, title='Hidden Topic', description='Topic description', section=free_section)
+        # Набор оплаченных модулей пользователя загружается в кэш заранее и не входит в число запросов
+        warm_paid_modules(self.user.id)
+
+    def test_topic_list_query_count(self):
+        url = reverse('main:topic-list')
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertNotIn('Hidden Topic', [topic['title'] for topic in response.data['results']])
+
+
+class SectionRetrieveAPIViewTest(APITestCase):
+    """Класс SectionRetrieveAPIViewTest проверяет, что раздел находится двумя запросами (ETag и раздел
+    с модулем через JOIN), а раздел неоплаченного модуля недоступен."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        paid_module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        free_module = Module.objects.create(user=self.user, number=2, title='Module 2',
+                                            description='Module 2 description')
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=paid_module)
+        self.hidden_section = Section.objects.create(number=1, title='Section 2', description='Section description',
+                                                     module=free_module)
+        warm_paid_modules(self.user.id)
+        self.client.force_authenticate(user=self.user)
+
+    def test_section_retrieve_query_count(self):
+        url = reverse('main:section-retrieve', kwargs={'pk': self.section.id})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], self.section.title)
+
+    def test_section_retrieve_unpaid_module(self):
+        url = reverse('main:section-retrieve', kwargs={'pk': self.hidden_section.id})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_section_retrieve_purchased_module(self):
+        Payment.objects.create(user=self.user, module=self.hidden_section.module, amount=100,
+                               status=PaymentStatus.CONFIRMED)
+        invalidate_paid_modules(self.user.id)
+        url = reverse('main:section-retrieve', kwargs={'pk': self.hidden_section.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], self.hidden_section.title)
+
+
+class TopicRetrieveAPIViewTest(APITestCase):
+    """Класс TopicRetrieveAPIViewTest проверяет, что тема находится двумя запросами (ETag и тема
+    с модулем через JOIN), а тема неоплаченного модуля недоступна."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        paid_module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        free_module = Module.objects.create(user=self.user, number=2, title='Module 2',
+                                            description='Module 2 description')
+        paid_section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=paid_module)
+        free_section = Section.objects.create(number=1, title='Section 2', description='Section description',
+                                              module=free_module)
+        self.topic = Topic.objects.create(number=1, title='Topic 1', description='Topic description',
+                                          section=paid_section)
+        self.hidden_topic = Topic.objects.create(number=1, title='Topic 2', description='Topic description',
+                                                 section=free_section)
+        warm_paid_modules(self.user.id)
+        self.client.force_authenticate(user=self.user)
+
+    def test_topic_retrieve_query_count(self):
+        url = reverse('main:topic-retrieve', kwargs={'pk': self.topic.id})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], self.topic.title)
+
+    def test_topic_retrieve_unpaid_module(self):
+        url = reverse('main:topic-retrieve', kwargs={'pk': self.hidden_topic.id})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_topic_retrieve_purchased_module(self):
+        Payment.objects.create(user=self.user, module=self.hidden_topic.module, amount=100,
+                               status=PaymentStatus.CONFIRMED)
+        invalidate_paid_modules(self.user.id)
+        url = reverse('main:topic-retrieve', kwargs={'pk': self.hidden_topic.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], self.hidden_topic.title)
+
+
+class EntitlementCacheTest(TestCase):
+    """Класс EntitlementCacheTest проверяет, что набор оплаченных модулей
+    загружается один раз, а проверки доступа выполняются без запросов к базе данных."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module 1 description')
+        self.other_module = Module.objects.create(user=self.user, number=2, title='Module 2',
+                                                  description='Module 2 description')
+        Payment.objects.create(user=self.user, module=self.module, amount=100, status=PaymentStatus.CONFIRMED)
+        invalidate_paid_modules(self.user.id)
+
+    def test_is_paid_by_uses_cached_set(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(self.module.is_paid_by(self.user))
+            self.assertTrue(self.module.is_paid_by(self.user))
+        self.assertEqual(get_paid_module_ids(self.user), frozenset([self.module.id]))
+
+    def test_section_accessible_by_payment(self):
+        section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                         module=self.module)
+        self.assertIn(section, Section.objects.accessible(self.user))
+        other_user = User.objects.create_user(username='other', email='other@example.com')
+        self.assertNotIn(section, Section.objects.accessible(other_user))
+
+    def test_invalidate_after_payment(self):
+        self.assertFalse(self.other_module.is_paid_by(self.user))
+        Payment.objects.create(user=self.user, module=self.other_module, amount=100,
+                               status=PaymentStatus.CONFIRMED)
+        invalidate_paid_modules(self.user.id)
+        self.assertTrue(self.other_module.is_paid_by(self.user))
+
+
+class ModuleTreeAPIViewTest(APITestCase):
+    """Класс ModuleTreeAPIViewTest проверяет, что дерево курса загружается
+    фиксированным числом запросов, а разделы и темы упорядочены по номеру."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        self.other_module = Module.objects.create(user=self.user, number=2, title='Module 2',
+                                                  description='Module 2 description', is_paid=True)
+        self.hidden_module = Module.objects.create(user=self.user, number=3, title='Module 3',
+                                                   description='Module 3 description')
+        for module in (self.module, self.other_module):
+            for section_number in (2, 1):
+                section = Section.objects.create(number=section_number, title=f'Section {section_number}',
+                                                 description='Section description', module=module)
+                for topic_number in (3, 1, 2):
+                    Topic.objects.create(number=topic_number, title=f'Topic {topic_number}',
+                                         description='Topic description', section=section)
+        self.client.force_authenticate(user=self.user)
+        get_paid_module_ids(self.user)
+
+    def test_module_tree(self):
+        url = reverse('main:module-tree', kwargs={'pk': self.module.id})
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([section['number'] for section in response.data['sections']], [1, 2])
+        self.assertEqual([topic['number'] for topic in response.data['sections'][0]['topics']], [1, 2, 3])
+
+    def test_module_tree_unpaid_module(self):
+        url = reverse('main:module-tree', kwargs={'pk': self.hidden_module.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_module_tree_list(self):
+        url = reverse('main:module-tree-list')
+        ids = f'{self.module.id},{self.other_module.id},{self.hidden_module.id}'
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'ids': ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([module['id'] for module in response.data], [self.module.id, self.other_module.id])
+        self.assertEqual(len(response.data[1]['sections'][1]['topics']), 3)
+
+    def test_module_tree_list_invalid_ids(self):
+        response = self.client.get(reverse('main:module-tree-list'), {'ids': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ContentCursorPaginationTest(APITestCase):
+    """Класс ContentCursorPaginationTest проверяет постраничный вывод списка модулей по курсору."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        for number in range(1, 6):
+            Module.objects.create(user=self.user, number=number, title=f'Module {number}',
+                                  description='Module description')
+
+    def test_module_list_pages(self):
+        response = self.client.get(reverse('main:module-list'), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([module['number'] for module in response.data['results']], [1, 2])
+
+        titles = []
+        next_url = response.data['next']
+        while next_url:
+            with self.assertNumQueries(2):
+                response = self.client.get(next_url)
+            titles += [module['title'] for module in response.data['results']]
+            next_url = response.data['next']
+        self.assertEqual(titles, ['Module 3', 'Module 4', 'Module 5'])
+
+    def test_module_list_page_size_cap(self):
+        response = self.client.get(reverse('main:module-list'), {'page_size': 100000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class ValuesSerializerParityTest(TestCase):
+    """Класс ValuesSerializerParityTest проверяет, что быстрый режим ValuesSerializer
+    возвращает побайтно тот же JSON, что и исходные сериализаторы."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        module = Module.objects.create(user=self.user, number=1, title='Модуль 1',
+                                       description='Описание модуля', is_paid=True)
+        Module.objects.create(user=self.user, number=2, title='Module 2', description='Module 2 description')
+        section = Section.objects.create(number=1, title='Раздел 1', description='Описание раздела', module=module)
+        Section.objects.create(number=2, title='Section without module', description='Section description')
+        Topic.objects.create(number=1, title='Тема 1', description='Описание темы', section=section)
+        Topic.objects.create(number=2, title='Topic without section', description='Topic description')
+
+    def assertParity(self, serializer_class, queryset):
+        values_serializer = ValuesSerializer.for_serializer(serializer_class)
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        actual = JSONRenderer().render(values_serializer.to_representation(values_serializer.values(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_module_parity(self):
+        self.assertParity(ModuleSerializer, Module.objects.order_by('id'))
+
+    def test_section_parity(self):
+        self.assertParity(SectionSerializer, Section.objects.order_by('id'))
+
+    def test_topic_parity(self):
+        self.assertParity(TopicSerializer, Topic.objects.order_by('id'))
+
+
+class SummaryListAPIViewTest(APITestCase):
+    """Класс SummaryListAPIViewTest проверяет краткое представление списков:
+    описания не попадают в ответ и не читаются из базы данных."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                       description='Module 1 description', is_paid=True)
+        section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                         module=module)
+        Topic.objects.create(number=1, title='Topic 1', description='Topic description', section=section)
+        self.client.force_authenticate(user=self.user)
+
+    def get_summary(self, url_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name), {'fields': 'summary'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for query in queries:
+            self.assertNotIn('description', query['sql'])
+        return response.data['results'][0]
+
+    def test_module_summary(self):
+        data = self.get_summary('main:module-list')
+        self.assertEqual(set(data), {'id', 'number', 'title', 'user', 'is_paid', 'section_count', 'topic_count',
+                                     'learner_count'})
+        self.assertEqual((data['section_count'], data['topic_count']), (1, 1))
+
+    def test_section_summary(self):
+        data = self.get_summary('main:section-list')
+        self.assertEqual(set(data), {'id', 'number', 'title', 'module', 'is_paid'})
+        self.assertTrue(data['is_paid'])
+
+    def test_topic_summary(self):
+        data = self.get_summary('main:topic-list')
+        self.assertEqual(set(data), {'id', 'number', 'title', 'section', 'is_paid'})
+        self.assertTrue(data['is_paid'])
+
+    def test_full_list_keeps_description(self):
+        response = self.client.get(reverse('main:topic-list'))
+        self.assertEqual(response.data['results'][0]['description'], 'Topic description')
+
+
+class ConditionalGetTest(APITestCase):
+    """Класс ConditionalGetTest проверяет ETag и Last-Modified у представлений
+    содержимого курса и ответ 304 без выборки строк и сериализации."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                       description='Module 1 description', is_paid=True)
+        section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                         module=module)
+        self.topic = Topic.objects.create(number=1, title='Topic 1', description='Topic description',
+                                          section=section)
+        self.client.force_authenticate(user=self.user)
+
+    def test_topic_list_not_modified(self):
+        url = reverse('main:topic-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response.headers)
+        etag = response.headers['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.headers['ETag'], etag)
+
+        self.topic.title = 'Updated Topic'
+        self.topic.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_topic_retrieve_if_modified_since(self):
+        url = reverse('main:topic-retrieve', kwargs={'pk': self.topic.id})
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response.headers['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_deleted_row_changes_etag(self):
+        first_section = self.topic.section
+        Section.objects.create(number=2, title='Section 2', description='Section description',
+                               module=first_section.module)
+        url = reverse('main:section-list')
+        etag = self.client.get(url).headers['ETag']
+        first_section.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_tree_state_without_cross_join(self):
+        module = self.topic.section.module
+        section = Section.objects.create(number=2, title='Section 2', description='Section description',
+                                         module=module)
+        for number in (2, 3):
+            Topic.objects.create(number=number, title=f'Topic {number}', description='Topic description',
+                                 section=section)
+        url = reverse('main:module-tree', kwargs={'pk': module.id})
+        request = APIRequestFactory().get(url)
+        request.user = self.user
+        view = ModuleTreeRetrieveAPIView(request=request, kwargs={'pk': module.id}, format_kwarg=None)
+        get_paid_module_ids(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            last_modified, counts = view.get_content_state()
+        # Разделы и темы агрегируются отдельными подзапросами, а не соединением, перемножающим строки
+        self.assertEqual(counts, [1, 2, 3])
+        self.assertEqual(last_modified, max(model.objects.latest('updated_at').updated_at
+                                            for model in (Module, Section, Topic)))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+
+
+class ResponseCacheTest(APITestCase):
+    """Класс ResponseCacheTest проверяет, что повторный запрос обслуживается из кэша ответов,
+    а изменение содержимого через API сразу делает закэшированный ответ недействительным."""
+
+    def setUp(self):
+        cache.clear()
+        response_cache.local.clear()
+        self.superuser = User.objects.create_superuser(username='admin', password='testpassword')
+        self.module = Module.objects.create(user=self.superuser, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.module)
+        self.client.force_authenticate(user=self.superuser)
+
+    def test_section_list_cache_hit(self):
+        url = reverse('main:section-list')
+        first = self.client.get(url)
+        hits = response_cache.get_stats()['local_hits']
+        with self.assertNumQueries(1):
+            second = self.client.get(url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(response_cache.get_stats()['local_hits'], hits + 1)
+
+    def test_update_invalidates_cached_tree(self):
+        url = reverse('main:module-tree', kwargs={'pk': self.module.id})
+        self.client.get(url)
+        update_url = reverse('main:module-update', kwargs={'pk': self.module.id})
+        self.client.patch(update_url, data={'title': 'Updated Title'}, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response.data['title'], 'Updated Title')
+
+    def test_cache_stats(self):
+        response = self.client.get(reverse('main:cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'local_hits', 'shared_hits', 'misses', 'hit_ratio'})
+
+
+class ContentBulkAPIViewTest(APITestCase):
+    """Класс ContentBulkAPIViewTest проверяет массовое создание, обновление и удаление тем:
+    количество запросов не зависит от количества объектов, ошибки возвращаются по каждому объекту."""
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(username='admin', password='testpassword')
+        self.module = Module.objects.create(user=self.superuser, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.module)
+        self.url = reverse('main:topic-bulk')
+        self.client.force_authenticate(user=self.superuser)
+
+    def make_topics(self, count):
+        return [{'number': number, 'title': f'Topic {number}', 'description': 'Topic description',
+                 'section': self.section.id} for number in range(count)]
+
+    def test_bulk_create_query_count(self):
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post(self.url, data=self.make_topics(5), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(self.url, data=self.make_topics(50), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(Topic.objects.count(), 55)
+
+    def test_bulk_create_ndjson(self):
+        body = '\n'.join(json.dumps(topic) for topic in self.make_topics(3))
+        response = self.client.post(self.url, data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Topic.objects.count(), 3)
+
+    def test_bulk_create_item_errors(self):
+        topics = self.make_topics(3)
+        topics[1]['section'] = 0
+        del topics[2]['title']
+        response = self.client.post(self.url, data=topics, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(Topic.objects.count(), 0)
+
+    def test_bulk_update_and_delete(self):
+        self.client.post(self.url, data=self.make_topics(3), format='json')
+        ids = list(Topic.objects.values_list('id', flat=True))
+        response = self.client.patch(self.url, data=[{'id': pk, 'title': 'Updated Title'} for pk in ids],
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Topic.objects.filter(title='Updated Title').count(), 3)
+
+        response = self.client.delete(self.url, data=ids[:2], format='json')
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(Topic.objects.count(), 1)
+
+
+class CourseExportImportTest(TestCase):
+    """Класс CourseExportImportTest проверяет, что выгруженный курс загружается
+    с новыми идентификаторами и сохраняет связи разделов и тем."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword')
+        self.module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        for section_number in (1, 2):
+            section = Section.objects.create(number=section_number, title=f'Section {section_number}',
+                                             description='Section description', module=self.module)
+            for topic_number in (1, 2, 3):
+                Topic.objects.create(number=topic_number, title=f'Topic {section_number}.{topic_number}',
+                                     description='Topic description', section=section)
+        Payment.objects.create(user=self.user, module=self.module, amount=100)
+
+    def test_export_import_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'course.ndjson.gz')
+            call_command('export_course', self.module.id, path, '--with-payments', stdout=open(os.devnull, 'w'))
+            call_command('import_course', path, '--batch-size', '2', stdout=open(os.devnull, 'w'))
+
+        imported = Module.objects.exclude(id=self.module.id).get()
+        self.assertEqual(imported.title, self.module.title)
+        self.assertEqual(imported.sections.count(), 2)
+        self.assertEqual(set(Topic.objects.filter(section__module=imported).values_list('title', flat=True)),
+                         set(Topic.objects.filter(section__module=self.module).values_list('title', flat=True)))
+        self.assertEqual(Topic.objects.filter(module=imported).count(), 6)
+        section = imported.sections.get(number=2)
+        self.assertEqual(section.topics.count(), 3)
+        self.assertTrue(Payment.objects.filter(user=self.user, module=imported).exists())
+
+    def test_import_counts_written_payments_and_invalidates_caches(self):
+        rows = [{'type': 'module', 'number': 2, 'title': 'Module 2', 'description': 'Module 2 description',
+                 'is_paid': False, 'user__email': self.user.email}]
+        rows += [{'type': 'payment', 'user__email': self.user.email, 'amount': '100',
+                  'status': PaymentStatus.CONFIRMED}] * 2
+        cache.clear()
+        entitlements._local_cache.clear()
+        # Набор оплаченных модулей пользователя кэшируется до загрузки
+        get_paid_module_ids(self.user)
+        output = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'course.ndjson.gz')
+            with gzip.open(path, 'wt', encoding='utf-8') as target:
+                target.writelines(json.dumps(row) + '\n' for row in rows)
+            call_command('import_course', path, stdout=output)
+
+        imported = Module.objects.exclude(id=self.module.id).get()
+        self.assertIn("'payment': 1", output.getvalue())
+        self.assertEqual(Payment.objects.filter(module=imported).count(), 1)
+        # Оплаченный загруженный модуль сразу доступен пользователю, закэшированный набор сброшен
+        self.assertIn(imported.id, get_paid_module_ids(self.user))
+
+
+class CeleryEagerMixin:
+    """Класс CeleryEagerMixin выполняет задачи Celery синхронно, без брокера сообщений."""
+
+    def setUp(self):
+        self._task_always_eager = confirm_payment.app.conf.task_always_eager
+        confirm_payment.app.conf.task_always_eager = True
+
+    def tearDown(self):
+        confirm_payment.app.conf.task_always_eager = self._task_always_eager
+
+
+class PaymentIdempotencyTest(APITestCase):
+    """Класс PaymentIdempotencyTest проверяет, что повторная оплата не создает дубликатов,
+    а оплата несуществующего модуля возвращает 404."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module 1 description')
+        self.url = reverse('main:payment-create', kwargs={'module_id': self.module.id})
+        self.client.force_authenticate(user=self.user)
+
+    def test_retry_with_same_key(self):
+        for _ in range(3):
+            response = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='payment-1')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(Payment.objects.filter(idempotency_key='payment-1').count(), 1)
+
+    def test_retry_without_key(self):
+        self.client.post(self.url)
+        self.client.post(self.url)
+        self.assertEqual(Payment.objects.filter(user=self.user, module=self.module).count(), 1)
+
+    def test_key_reused_for_other_module(self):
+        other_module = Module.objects.create(user=self.user, number=2, title='Module 2',
+                                             description='Module 2 description')
+        response = self.client.post(self.url, HTTP_IDEMPOTENCY_KEY='payment-1')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        url = reverse('main:payment-create', kwargs={'module_id': other_module.id})
+        response = self.client.post(url, HTTP_IDEMPOTENCY_KEY='payment-1')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Payment.objects.filter(user=self.user, module=other_module).exists())
+
+    def test_missing_module(self):
+        url = reverse('main:payment-create', kwargs={'module_id': self.module.id + 1000})
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@unittest.skipIf(connection.vendor == 'sqlite', 'SQLite не поддерживает параллельную запись')
+class PaymentConcurrencyTest(CeleryEagerMixin, TransactionTestCase):
+    """Класс PaymentConcurrencyTest отправляет сотни параллельных запросов оплаты
+    и проверяет, что для каждого ключа идемпотентности создан ровно один платеж."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.modules = [Module.objects.create(user=self.user, number=number, title=f'Module {number}',
+                                              description='Module description') for number in range(4)]
+
+    def pay(self, number):
+        module = self.modules[number % len(self.modules)]
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        try:
+            response = client.post(reverse('main:payment-create', kwargs={'module_id': module.id}),
+                                   HTTP_IDEMPOTENCY_KEY=f'payment-{module.id}')
+            return response.status_code
+        finally:
+            connection.close()
+
+    def test_parallel_payments(self):
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            statuses = list(executor.map(self.pay, range(200)))
+        self.assertEqual(set(statuses), {status.HTTP_202_ACCEPTED})
+        self.assertEqual(Payment.objects.count(), len(self.modules))
+        for module in self.modules:
+            self.assertEqual(Payment.objects.filter(idempotency_key=f'payment-{module.id}').count(), 1)
+
+
+class DecliningPaymentProvider(PaymentProvider):
+    """Платежный провайдер для тестов, отклоняющий любой платеж."""
+
+    def confirm(self, payment):
+        return False
+
+
+class PaymentConfirmationTest(CeleryEagerMixin, APITestCase):
+    """Класс PaymentConfirmationTest проверяет подтверждение платежа задачей Celery
+    в синхронном режиме и просмотр статуса платежа."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module 1 description')
+        invalidate_paid_modules(self.user.id)
+        self.url = reverse('main:payment-create', kwargs={'module_id': self.module.id})
+        self.client.force_authenticate(user=self.user)
+
+    def pay(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response.data['id']
+
+    def test_payment_confirmed(self):
+        payment_id = self.pay()
+        response = self.client.get(reverse('main:payment-status', kwargs={'pk': payment_id}))
+        self.assertEqual(response.data['status'], PaymentStatus.CONFIRMED)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.module.is_paid_by(self.user))
+        self.module.refresh_from_db()
+        self.assertEqual(self.module.learner_count, 1)
+
+    @override_settings(PAYMENT_PROVIDER='main.tests.DecliningPaymentProvider')
+    def test_payment_failed(self):
+        payment_id = self.pay()
+        self.assertEqual(Payment.objects.get(id=payment_id).status, PaymentStatus.FAILED)
+        self.assertFalse(self.module.is_paid_by(self.user))
+
+    def test_failed_payment_retry(self):
+        with override_settings(PAYMENT_PROVIDER='main.tests.DecliningPaymentProvider'):
+            self.pay()
+        payment_id = self.pay()
+        self.assertEqual(Payment.objects.get(id=payment_id).status, PaymentStatus.CONFIRMED)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_status_of_other_user_payment(self):
+        payment_id = self.pay()
+        other_user = User.objects.create_user(username='otheruser', email='otheruser@example.com',
+                                              password='testpassword')
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get(reverse('main:payment-status', kwargs={'pk': payment_id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ModuleCountersTest(APITestCase):
+    """Класс ModuleCountersTest проверяет, что счетчики разделов и тем модуля изменяются при создании,
+    переносе и удалении содержимого, а задача reconcile_module_counters исправляет расхождения."""
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(username='admin', password='testpassword')
+        self.module = Module.objects.create(user=self.superuser, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        self.other_module = Module.objects.create(user=self.superuser, number=2, title='Module 2',
+                                                  description='Module 2 description', is_paid=True)
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.module)
+        for number in (1, 2):
+            Topic.objects.create(number=number, title=f'Topic {number}', description='Topic description',
+                                 section=self.section)
+
+    def assertCounters(self, module, section_count, topic_count):
+        module.refresh_from_db()
+        self.assertEqual((module.section_count, module.topic_count), (section_count, topic_count))
+
+    def test_create_and_delete(self):
+        self.assertCounters(self.module, 1, 2)
+        self.section.topics.first().delete()
+        self.assertCounters(self.module, 1, 1)
+        self.section.delete()
+        self.assertCounters(self.module, 0, 0)
+
+    def test_section_move(self):
+        self.section.module = self.other_module
+        self.section.save()
+        self.assertCounters(self.module, 0, 0)
+        self.assertCounters(self.other_module, 1, 2)
+
+    def test_bulk_endpoints(self):
+        self.client.force_authenticate(user=self.superuser)
+        topics = [{'number': number, 'title': f'Topic {number}', 'description': 'Topic description',
+                   'section': self.section.id} for number in range(3, 6)]
+        self.client.post(reverse('main:topic-bulk'), data=topics, format='json')
+        self.assertCounters(self.module, 1, 5)
+        self.client.delete(reverse('main:section-bulk'), data=[self.section.id], format='json')
+        self.assertCounters(self.module, 0, 0)
+
+    def test_reconcile(self):
+        Module.objects.filter(pk=self.module.pk).update(section_count=10, topic_count=0)
+        self.assertEqual(reconcile_module_counters(), 1)
+        self.assertCounters(self.module, 1, 2)
+        self.assertFalse(Module.objects.with_stale_counters().exists())
+
+
+class TopicModuleTest(TestCase):
+    """Класс TopicModuleTest проверяет, что денормализованный модуль темы совпадает с модулем раздела
+    после создания темы, переноса темы и раздела, а команда check_topic_modules исправляет расхождения."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        self.other_module = Module.objects.create(user=self.user, number=2, title='Module 2',
+                                                  description='Module 2 description', is_paid=False)
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.module)
+        self.topic = Topic.objects.create(number=1, title='Topic 1', description='Topic description',
+                                          section=self.section)
+
+    def test_topic_save_sets_module(self):
+        self.assertEqual(self.topic.module_id, self.module.id)
+        other_section = Section.objects.create(number=2, title='Section 2', description='Section description',
+                                               module=self.other_module)
+        self.topic.section = other_section
+        self.topic.save(update_fields=['section'])
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.module_id, self.other_module.id)
+
+    def test_section_move_updates_topics(self):
+        updated_at = self.topic.updated_at
+        self.section.module = self.other_module
+        self.section.save()
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.module_id, self.other_module.id)
+        self.assertGreater(self.topic.updated_at, updated_at)
+        self.assertFalse(Topic.objects.accessible(self.user).exists())
+
+    def test_section_save_without_move_skips_topics(self):
+        self.section.title = 'Updated Section'
+        with CaptureQueriesContext(connection) as queries:
+            self.section.save()
+        self.assertFalse([query for query in queries if 'main_topic' in query['sql']])
+
+    def test_check_topic_modules_repairs_drift(self):
+        Topic.objects.filter(pk=self.topic.pk).update(module=self.other_module)
+        self.assertEqual(list(Topic.objects.with_stale_module()), [self.topic])
+        call_command('check_topic_modules', '--batch-size', '1', stdout=open(os.devnull, 'w'))
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.module_id, self.module.id)
+        self.assertFalse(Topic.objects.with_stale_module().exists())
+
+
+class SearchAPIViewTest(APITestCase):
+    """Класс SearchAPIViewTest проверяет поиск модулей, разделов и тем: разделы и темы
+    неоплаченных модулей не попадают в результаты, некорректные параметры отклоняются."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        invalidate_paid_modules(self.user.id)
+        open_module = Module.objects.create(user=self.user, number=1, title='Основы Python',
+                                            description='Введение в язык', is_paid=True)
+        closed_module = Module.objects.create(user=self.user, number=2, title='Python для анализа данных',
+                                              description='Pandas и NumPy', is_paid=False)
+        for module in (open_module, closed_module):
+            section = Section.objects.create(number=1, title=f'Python: {module.title}',
+                                             description='Section description', module=module)
+            Topic.objects.create(number=1, title='Topic', description='Списки и словари в Python',
+                                 section=section)
+        self.open_module = open_module
+        self.client.force_authenticate(user=self.user)
+
+    def test_search_filters_by_access(self):
+        response = self.client.get(reverse('main:search'), {'q': 'Python'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([module['id'] for module in response.data['module']], [self.open_module.id])
+        self.assertEqual([section['module'] for section in response.data['section']], [self.open_module.id])
+        self.assertEqual(len(response.data['topic']), 1)
+        self.assertIn('rank', response.data['topic'][0])
+
+    def test_search_single_type(self):
+        response = self.client.get(reverse('main:search'), {'q': 'словари', 'type': 'topic'})
+        self.assertEqual(set(response.data), {'topic'})
+        self.assertEqual(len(response.data['topic']), 1)
+
+    def test_search_invalid_params(self):
+        self.assertEqual(self.client.get(reverse('main:search'), {'q': 'P'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('main:search'), {'q': 'Python', 'type': 'user'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class AdminChangelistTest(TestCase):
+    """Класс AdminChangelistTest проверяет, что количество запросов страниц списков админки
+    не зависит от количества строк."""
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(username='admin', email='admin@example.com',
+                                                       password='testpassword')
+        self.module = Module.objects.create(user=self.superuser, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.module)
+        self.client.force_login(self.superuser)
+
+    def add_rows(self, count):
+        for number in range(count):
+            module = Module.objects.create(user=self.superuser, number=number, title=f'Module {number}',
+                                           description='Module description')
+            section = Section.objects.create(number=number, title=f'Section {number}',
+                                             description='Section description', module=module)
+            Topic.objects.create(number=number, title=f'Topic {number}', description='Topic description',
+                                 section=section)
+            Payment.objects.create(user=self.superuser, module=module, amount=100)
+
+    def test_changelist_query_count(self):
+        for model_name in ('module', 'section', 'topic', 'payment'):
+            url = reverse(f'admin:main_{model_name}_changelist')
+            self.add_rows(2)
+            with CaptureQueriesContext(connection) as small:
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            self.add_rows(10)
+            with CaptureQueriesContext(connection) as large:
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            self.assertEqual(len(large), len(small), model_name)
+
+
+@modify_settings(MIDDLEWARE={'append': 'main.middleware.RequestMetricsMiddleware'})
+class RequestMetricsMiddlewareTest(APITestCase):
+    """Класс RequestMetricsMiddlewareTest проверяет заголовок Server-Timing, гистограммы
+    метрик по имени URL и запись SQL-запросов в журнал при превышении порога."""
+
+    def setUp(self):
+        cache.clear()
+        response_cache.local.clear()
+        metrics_registry.reset()
+        self.superuser = User.objects.create_superuser(username='admin', password='testpassword')
+        module = Module.objects.create(user=self.superuser, number=1, title='Module 1',
+                                       description='Module 1 description', is_paid=True)
+        Section.objects.create(number=1, title='Section 1', description='Section description', module=module)
+        self.client.force_authenticate(user=self.superuser)
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get(reverse('main:section-list'))
+        self.assertRegex(response.headers['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", '
+                                                            r'serialize;dur=[\d.]+, total;dur=[\d.]+$')
+        metrics = self.client.get(reverse('main:metrics')).content.decode()
+        self.assertIn('http_responses_total{view="section-list",method="GET",status="200"} 1', metrics)
+        self.assertIn('http_request_queries_count{view="section-list",method="GET"} 1', metrics)
+
+    def test_metrics_forbidden_for_user(self):
+        user = User.objects.create_user(username='user', email='user@example.com', password='testpassword')
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get(reverse('main:metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_query_threshold_logs_sql(self):
+        with mock.patch('main.middleware.REQUEST_QUERY_LOG_THRESHOLD', 0), \
+                self.assertLogs('main.middleware', level='WARNING') as logs:
+            self.client.get(reverse('main:section-list'))
+        self.assertIn('SELECT', logs.output[0])
+
+
+class BenchApiCommandTest(TestCase):
+    """Класс BenchApiCommandTest проверяет, что команда bench_api выполняет все сценарии
+    на данных seed_courses и не изменяет данные изменяющими сценариями."""
+
+    def test_bench_api_report(self):
+        call_command('seed_courses', '--users', '3', '--modules', '2', '--sections', '2', '--topics', '2',
+                     '--payments', '1', '--paid-ratio', '1', '--password', 'bench', stdout=open(os.devnull, 'w'))
+        topic_count = Topic.objects.count()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.json')
+            call_command('bench_api', '--iterations', '2', '--warmup', '0', '--password', 'bench',
+                         '--host', 'testserver', '--output', path, stdout=open(os.devnull, 'w'))
+            with open(path, encoding='utf-8') as report_file:
+                report = json.load(report_file)
+        self.assertEqual(report['meta']['topics'], topic_count)
+        self.assertEqual(Topic.objects.count(), topic_count)
+        # Все сценарии, включая изменяющие, должны выполняться успешно: ошибка в представлении
+        # не должна попадать в замер как быстрый ответ 4xx/5xx
+        for name, result in report['scenarios'].items():
+            self.assertTrue(all(code.startswith('2') for code in result['statuses']), (name, result['statuses']))
+        self.assertEqual(report['scenarios']['section-create']['statuses'], {'201': 2})
+        self.assertIn('p99_ms', report['scenarios']['module-tree'])
+
+
+class AsyncContentViewsTest(TestCase):
+    """Класс AsyncContentViewsTest проверяет асинхронные представления чтения
+    модулей, разделов и тем с аутентификацией по JWT."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        invalidate_paid_modules(self.user.id)
+        self.module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.module)
+        for number in (2, 1):
+            Topic.objects.create(number=number, title=f'Topic {number}', description='Topic description',
+                                 section=self.section)
+        token = UserTokenObtainPairSerializer.get_token(self.user).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def test_async_topic_list(self):
+        response = self.client.get(reverse('main:async-topic-list'), {'page_size': 1}, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertIsNone(data['previous'])
+        response = self.client.get(data['next'], **self.auth)
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertIsNone(response.json()['next'])
+        self.assertIsNotNone(response.json()['previous'])
+
+    def test_async_list_matches_sync_view(self):
+        params = {'page_size': 1}
+        sync_data = self.client.get(reverse('main:topic-list'), params, **self.auth).json()
+        async_data = self.client.get(reverse('main:async-topic-list'), params, **self.auth).json()
+        self.assertEqual(async_data['results'], sync_data['results'])
+        self.assertEqual(urlparse(async_data['next']).query, urlparse(sync_data['next']).query)
+
+    def test_async_topic_list_invalid_cursor(self):
+        response = self.client.get(reverse('main:async-topic-list'), {'cursor': 'invalid'}, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_topic_list_requires_token(self):
+        response = self.client.get(reverse('main:async-topic-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_section_detail_matches_sync_view(self):
+        url = reverse('main:async-section-retrieve', kwargs={'pk': self.section.id})
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.json(), SectionSerializer(self.section).data)
+
+    def test_async_topic_detail_purchased_module(self):
+        Module.objects.filter(pk=self.module.pk).update(is_paid=False)
+        topic = self.section.topics.first()
+        url = reverse('main:async-topic-retrieve', kwargs={'pk': topic.id})
+        self.assertEqual(self.client.get(url, **self.auth).status_code, status.HTTP_404_NOT_FOUND)
+        Payment.objects.create(user=self.user, module=self.module, amount=100, status=PaymentStatus.CONFIRMED)
+        invalidate_paid_modules(self.user.id)
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['id'], topic.id)
+
+    def test_async_module_tree(self):
+        url = reverse('main:async-module-tree', kwargs={'pk': self.module.id})
+        # Пользователь строится по утверждениям токена без запросов. Первый запрос загружает оплаченные
+        # модули пользователя и дерево (модуль, разделы, темы), повторный берет оплаченные модули из кэша
+        with self.assertNumQueries(1 + 3):
+            response = self.client.get(url, **self.auth)
+        with self.assertNumQueries(3):
+            self.client.get(url, **self.auth)
+        data = response.json()
+        self.assertEqual(data['id'], self.module.id)
+        self.assertEqual([topic['number'] for topic in data['sections'][0]['topics']], [1, 2])
+
+
+class ContentPermissionTest(APITestCase):
+    """Класс ContentPermissionTest проверяет права на изменение разделов и тем по роли пользователя
+    и владельцу модуля"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', is_staff=True)
+        self.staff = User.objects.create_user(username='staff', email='staff@example.com', is_staff=True)
+        self.moderator = User.objects.create_user(username='moderator', email='moderator@example.com',
+                                                  roles=UserRoles.MODERATOR)
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', roles=UserRoles.ADMIN)
+        self.member = User.objects.create_user(username='member', email='member@example.com')
+        self.module = Module.objects.create(user=self.owner, number=1, title='Module 1',
+                                            description='Module description', is_paid=True)
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.module)
+        self.topic = Topic.objects.create(number=1, title='Topic 1', description='Topic description',
+                                          section=self.section)
+
+    def request(self, user, method, url_name, data=None, **kwargs):
+        self.client.force_authenticate(user=user)
+        return getattr(self.client, method)(reverse(url_name, kwargs=kwargs), data, format='json')
+
+    def test_owner_edits_and_deletes(self):
+        response = self.request(self.owner, 'patch', 'main:section-update', {'title': 'Updated'}, pk=self.section.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.request(self.owner, 'delete', 'main:topic-destroy', pk=self.topic.id)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_staff_not_owner_forbidden(self):
+        response = self.request(self.staff, 'patch', 'main:topic-update', {'title': 'Updated'}, pk=self.topic.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.request(self.staff, 'post', 'main:topic-create', {
+            'number': 2, 'title': 'Topic 2', 'description': 'Topic description', 'section': self.section.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Topic.objects.count(), 1)
+
+    def test_moderator_edits_but_not_deletes(self):
+        response = self.request(self.moderator, 'patch', 'main:topic-update', {'title': 'Updated'},
+                                pk=self.topic.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.request(self.moderator, 'delete', 'main:section-destroy', pk=self.section.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.request(self.moderator, 'post', 'main:module-create', {
+            'number': 2, 'title': 'Module 2', 'description': 'Module description', 'user': self.moderator.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_admin_role_deletes_any(self):
+        response = self.request(self.admin, 'delete', 'main:section-destroy', pk=self.section.id)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_member_forbidden(self):
+        response = self.request(self.member, 'patch', 'main:module-update', {'title': 'Updated'}, pk=self.module.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_move_to_foreign_module_forbidden(self):
+        other_module = Module.objects.create(user=self.staff, number=2, title='Module 2',
+                                             description='Module description', is_paid=True)
+        response = self.request(self.owner, 'patch', 'main:section-update', {'module': other_module.id},
+                                pk=self.section.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.section.refresh_from_db()
+        self.assertEqual(self.section.module_id, self.module.id)
+
+    def test_bulk_foreign_items_forbidden(self):
+        other_module = Module.objects.create(user=self.staff, number=2, title='Module 2',
+                                             description='Module description', is_paid=True)
+        other_section = Section.objects.create(number=1, title='Section 2', description='Section description',
+                                               module=other_module)
+        response = self.request(self.owner, 'patch', 'main:section-bulk', [
+            {'id': self.section.id, 'title': 'Updated'}, {'id': other_section.id, 'title': 'Updated'}])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Section.objects.filter(title='Updated').exists())
+
+        response = self.request(self.owner, 'post', 'main:topic-bulk', [
+            {'number': 2, 'title': 'Topic 2', 'description': 'Topic description', 'section': self.section.id},
+            {'number': 2, 'title': 'Topic 2', 'description': 'Topic description', 'section': other_section.id}])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Topic.objects.count(), 1)
+
+        response = self.request(self.owner, 'delete', 'main:section-bulk', [self.section.id, other_section.id])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Section.objects.count(), 2)
+
+    def test_bulk_own_items_and_moderator(self):
+        response = self.request(self.owner, 'post', 'main:topic-bulk', [
+            {'number': 2, 'title': 'Topic 2', 'description': 'Topic description', 'section': self.section.id}])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.request(self.moderator, 'patch', 'main:topic-bulk', [{'id': self.topic.id, 'title': 'Updated'}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.request(self.moderator, 'delete', 'main:topic-bulk', [self.topic.id])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.request(self.owner, 'delete', 'main:topic-bulk', [self.topic.id])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ownership_without_extra_queries(self):
+        # Владелец определяется в том же запросе, что и тема, поэтому количество запросов не зависит от роли
+        counts = {}
+        for user in (self.admin, self.owner):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.request(user, 'patch', 'main:topic-update', {'title': 'Updated'}, pk=self.topic.id)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            counts[user.username] = len(queries)
+        self.assertEqual(counts['admin'], counts['owner'])
+
+
+class TopicProgressTest(APITestCase):
+    """Класс TopicProgressTest проверяет накопление отметок просмотра тем в кэше, их запись в базу данных
+    периодической задачей и расчет процента прохождения модулей"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='testuser', email='testuser@example.com')
+        self.module = Module.objects.create(user=self.user, number=1, title='Module 1',
+                                            description='Module description', is_paid=True)
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.module)
+        self.topic = Topic.objects.create(number=1, title='Topic 1', description='Topic description',
+                                          section=self.section)
+        self.other_topic = Topic.objects.create(number=2, title='Topic 2', description='Topic description',
+                                                section=self.section)
+        self.client.force_authenticate(user=self.user)
+
+    def heartbeat(self, topic, position, seconds):
+        return self.client.post(reverse('main:topic-heartbeat', kwargs={'pk': topic.id}),
+                                {'position': position, 'seconds': seconds}, format='json')
+
+    def test_heartbeat_without_queries(self):
+        with self.assertNumQueries(0):
+            response = self.heartbeat(self.topic, 10, 15)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(TopicProgress.objects.exists())
+
+    def test_heartbeat_validation(self):
+        self.assertEqual(self.heartbeat(self.topic, 150, 15).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.heartbeat(self.topic, 10, -1).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_flush_accumulates_heartbeats(self):
+        self.heartbeat(self.topic, 40, 10)
+        self.heartbeat(self.topic, 30, 20)
+        self.assertEqual(flush_topic_progress(), 1)
+        progress = TopicProgress.objects.get(user=self.user, topic=self.topic)
+        self.assertEqual((progress.position, progress.time_spent), (40, 30))
+        self.assertIsNone(progress.completed_at)
+
+        # Без новых отметок повторная запись ничего не меняет, новые отметки добавляются к сохраненным
+        self.assertEqual(flush_topic_progress(), 0)
+        self.heartbeat(self.topic, 100, 5)
+        self.assertEqual(flush_topic_progress(), 1)
+        progress.refresh_from_db()
+        self.assertEqual((progress.position, progress.time_spent), (100, 35))
+        self.assertIsNotNone(progress.completed_at)
+
+    def test_flush_locked(self):
+        self.heartbeat(self.topic, 40, 10)
+        cache.add(progress._LOCK_KEY, 'other', progress.PROGRESS_FLUSH_LOCK_TTL)
+        self.assertEqual(flush_topic_progress(), 0)
+        self.assertFalse(TopicProgress.objects.exists())
+        cache.delete(progress._LOCK_KEY)
+        self.assertEqual(flush_topic_progress(), 1)
+        self.assertIsNone(cache.get(progress._LOCK_KEY))
+
+    def test_heartbeat_during_flush(self):
+        self.heartbeat(self.topic, 40, 10)
+        write_progress = progress._write_progress
+
+        def write_with_heartbeat(pairs, values):
+            # Отметка, пришедшая во время записи, попадает в новый журнал, а повторная запись блокируется
+            self.heartbeat(self.topic, 50, 20)
+            self.assertEqual(flush_topic_progress(), 0)
+            write_progress(pairs, values)
+
+        with mock.patch('main.progress._write_progress', side_effect=write_with_heartbeat):
+            self.assertEqual(flush_topic_progress(), 1)
+        self.assertEqual(flush_topic_progress(), 1)
+        record = TopicProgress.objects.get(user=self.user, topic=self.topic)
+        self.assertEqual((record.position, record.time_spent), (50, 30))
+
+    def test_failed_flush_keeps_seconds(self):
+        self.heartbeat(self.topic, 40, 10)
+        with mock.patch('main.progress._write_progress', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush_topic_progress()
+        self.assertIsNone(cache.get(progress._LOCK_KEY))
+        self.assertEqual(flush_topic_progress(), 1)
+        self.assertEqual(TopicProgress.objects.get(user=self.user, topic=self.topic).time_spent, 10)
+
+    def test_flush_skips_inaccessible_topic(self):
+        Module.objects.filter(pk=self.module.pk).update(is_paid=False)
+        self.heartbeat(self.topic, 40, 10)
+        self.assertEqual(flush_topic_progress(), 0)
+        self.assertFalse(TopicProgress.objects.exists())
+
+    def test_complete_and_module_progress(self):
+        response = self.client.post(reverse('main:topic-complete', kwargs={'pk': self.topic.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        completed_at = response.data['completed_at']
+        self.heartbeat(self.other_topic, 20, 60)
+        flush_topic_progress()
+
+        # Повторная отметка не меняет дату завершения
+        response = self.client.post(reverse('main:topic-complete', kwargs={'pk': self.topic.id}))
+        self.assertEqual(response.data['completed_at'], completed_at)
+
+        response = self.client.get(reverse('main:progress-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['module'], self.module.id)
+        self.assertEqual((results[0]['completed'], results[0]['started'], results[0]['topic_count']), (1, 2, 2))
+        self.assertEqual(results[0]['percent'], 50)
+        self.assertEqual(results[0]['total_time_spent'], 60)
+
+    def test_complete_inaccessible_topic(self):
+        Module.objects.filter(pk=self.module.pk).update(is_paid=False)
+        response = self.client.post(reverse('main:topic-complete', kwargs={'pk': self.topic.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+# Размеры данных, на которых проверяется бюджет SQL-запросов: количество строк не должно влиять на число запросов
+QUERY_BUDGET_SIZES = (2, 20)
+
+
+def query_budget(max_queries, sizes=QUERY_BUDGET_SIZES):
+    """Декоратор теста с бюджетом SQL-запросов. Тест принимает размер size, добавляет данные этого размера
+    и возвращает функцию, которая выполняет запрос к представлению. Запрос выполняется для каждого размера
+    с очищенными кэшами; тест не проходит, если запрос завершился ошибкой, выполнил больше max_queries
+    запросов или количество запросов выросло вместе с количеством строк"""
+
+    def decorator(test):
+        @functools.wraps(test)
+        def wrapper(self):
+            counts = {}
+            for size in sizes:
+                make_request = test(self, size)
+                cache.clear()
+                response_cache.local.clear()
+                entitlements._local_cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = make_request()
+                self.assertLess(response.status_code, 400, f'size={size}: {getattr(response, "data", None)}')
+                counts[size] = len(queries)
+                sql = '\n'.join(query['sql'] for query in queries.captured_queries)
+                self.assertLessEqual(len(queries), max_queries, f'size={size}, бюджет {max_queries}:\n{sql}')
+            self.assertEqual(len(set(counts.values())), 1, f'Количество запросов зависит от объема данных: {counts}')
+        return wrapper
+    return decorator
+
+
+class QueryBudgetTest(APITestCase):
+    """Класс QueryBudgetTest задает бюджет SQL-запросов для представлений модулей, разделов, тем
+    и платежей и проверяет, что количество запросов не растет с количеством строк."""
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(username='admin', email='admin@example.com',
+                                                       password='testpassword')
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword')
+        self.module = Module.objects.create(user=self.superuser, number=1, title='Module 1',
+                                            description='Module 1 description', is_paid=True)
+        self.section = Section.objects.create(number=1, title='Section 1', description='Section description',
+                                              module=self.module)
+        self.topic = Topic.objects.create(number=1, title='Topic 1', description='Topic description',
+                                          section=self.section)
+        self.payment = Payment.objects.create(user=self.user, module=self.module, amount=100,
+                                              status=PaymentStatus.CONFIRMED)
+
+    def seed(self, size):
+        """Добавляет size модулей, в каждом по size разделов с двумя темами"""
+        modules = Module.objects.bulk_create([
+            Module(user=self.superuser, number=number, title=f'Module {number}', description='Module description',
+                   is_paid=True) for number in range(size)
+        ])
+        sections = Section.objects.bulk_create([
+            Section(module=module, number=number, title=f'Section {number}', description='Section description')
+            for module in modules + [self.module] for number in range(size)
+        ])
+        Topic.objects.bulk_create([
+            Topic(section=section, module_id=section.module_id, number=number, title=f'Topic {number}',
+                  description='Topic description') for section in sections for number in range(2)
+        ])
+        Payment.objects.bulk_create([Payment(user=self.user, module=module, amount=100,
+                                             status=PaymentStatus.CONFIRMED) for module in modules])
+        # bulk_create не вызывает save(), поэтому счетчики модулей пересчитываются
+        Module.objects.filter(pk__in=[module.pk for module in modules + [self.module]]).refresh_counters()
+        return modules
+
+    def get(self, user, url_name, params=None, **kwargs):
+        self.client.force_authenticate(user=user)
+        return lambda: self.client.get(reverse(url_name, kwargs=kwargs), params)
+
+    def send(self, method, url_name, data=None, **kwargs):
+        self.client.force_authenticate(user=self.superuser)
+        return lambda: getattr(self.client, method)(reverse(url_name, kwargs=kwargs), data, format='json')
+
+    @query_budget(2)
+    def test_module_list(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:module-list')
+
+    @query_budget(2)
+    def test_module_list_summary(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:module-list', {'fields': 'summary'})
+
+    @query_budget(4)
+    def test_module_retrieve(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:module-retrieve', pk=self.module.id)
+
+    @query_budget(5)
+    def test_module_tree(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:module-tree', pk=self.module.id)
+
+    @query_budget(5)
+    def test_module_tree_list(self, size):
+        module_ids = [module.id for module in self.seed(size)][:2]
+        return self.get(self.user, 'main:module-tree-list', {'ids': ','.join(map(str, module_ids))})
+
+    @query_budget(3)
+    def test_module_create(self, size):
+        self.seed(size)
+        return self.send('post', 'main:module-create', {'number': 2, 'title': 'Module 2',
+                                                        'description': 'Module description',
+                                                        'user': self.superuser.id})
+
+    @query_budget(4)
+    def test_module_update(self, size):
+        self.seed(size)
+        return self.send('patch', 'main:module-update', {'title': 'Updated Title'}, pk=self.module.id)
+
+    @query_budget(12)
+    def test_module_destroy(self, size):
+        module = self.seed(size)[0]
+        return self.send('delete', 'main:module-destroy', pk=module.id)
+
+    @query_budget(3)
+    def test_section_list(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:section-list')
+
+    @query_budget(3)
+    def test_section_list_summary(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:section-list', {'fields': 'summary'})
+
+    @query_budget(3)
+    def test_section_retrieve(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:section-retrieve', pk=self.section.id)
+
+    @query_budget(5)
+    def test_section_bulk_create(self, size):
+        modules = self.seed(size)
+        return self.send('post', 'main:section-bulk', [
+            {'number': 1, 'title': 'Bulk Section', 'description': 'Section description', 'module': module.id}
+            for module in modules
+        ])
+
+    @query_budget(4)
+    def test_section_create(self, size):
+        self.seed(size)
+        return self.send('post', 'main:section-create', {'number': 2, 'title': 'Section 2',
+                                                         'description': 'Section description',
+                                                         'module': self.module.id})
+
+    @query_budget(5)
+    def test_section_update(self, size):
+        self.seed(size)
+        return self.send('patch', 'main:section-update', {'title': 'Updated Title'}, pk=self.section.id)
+
+    @query_budget(8)
+    def test_section_destroy(self, size):
+        self.seed(size)
+        section = Section.objects.filter(module=self.module).order_by('-id').first()
+        return self.send('delete', 'main:section-destroy', pk=section.id)
+
+    @query_budget(3)
+    def test_topic_list(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:topic-list')
+
+    @query_budget(3)
+    def test_topic_list_summary(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:topic-list', {'fields': 'summary'})
+
+    @query_budget(3)
+    def test_topic_retrieve(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:topic-retrieve', pk=self.topic.id)
+
+    @query_budget(5)
+    def test_topic_bulk_create(self, size):
+        self.seed(size)
+        sections = Section.objects.filter(module=self.module).values_list('id', flat=True)
+        return self.send('post', 'main:topic-bulk', [
+            {'number': 1, 'title': 'Bulk Topic', 'description': 'Topic description', 'section': section_id}
+            for section_id in sections
+        ])
+
+    @query_budget(5)
+    def test_topic_create(self, size):
+        self.seed(size)
+        return self.send('post', 'main:topic-create', {'number': 2, 'title': 'Topic 2',
+                                                       'description': 'Topic description',
+                                                       'section': self.section.id})
+
+    @query_budget(5)
+    def test_topic_update(self, size):
+        self.seed(size)
+        return self.send('patch', 'main:topic-update', {'title': 'Updated Title'}, pk=self.topic.id)
+
+    @query_budget(4)
+    def test_topic_destroy(self, size):
+        self.seed(size)
+        topic = Topic.objects.filter(module=self.module).order_by('-id').first()
+        return self.send('delete', 'main:topic-destroy', pk=topic.id)
+
+    @query_budget(4)
+    def test_search(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:search', {'q': 'Topic'})
+
+    @query_budget(3)
+    def test_payment_create(self, size):
+        module = self.seed(size)[0]
+        return self.send('post', 'main:payment-create', module_id=module.id)
+
+    @query_budget(1)
+    def test_payment_status(self, size):
+        self.seed(size)
+        return self.get(self.user, 'main:payment-status', pk=self.payment.id)
+
+    @query_budget(0)
+    def test_topic_heartbeat(self, size):
+        self.seed(size)
+        return self.send('post', 'main:topic-heartbeat', {'position': 50, 'seconds': 30}, pk=self.topic.id)
+
+    @query_budget(6)
+    def test_topic_complete(self, size):
+        self.seed(size)
+        TopicProgress.objects.filter(topic=self.topic).delete()
+        return self.send('post', 'main:topic-complete', pk=self.topic.id)
+
+    @query_budget(1)
+    def test_progress_list(self, size):
+        for module in self.seed(size):
+            topic = Topic.objects.filter(module=module).first()
+            TopicProgress.objects.create(user=self.user, topic=topic, position=100, completed_at=topic.updated_at)
+        return self.get(self.user, 'main:progress-list')
@@ -1,5 +1,6 @@
 from django.urls import path
 
+from . import async_views
 from .apps import MainConfig
 from .views import *
 
@@ -11,15 +12,34 @@ urlpatterns = [
     path('module/<int:pk>/', ModuleRetrieveAPIView.as_view(), name='module-retrieve'),
     path('module/update/<int:pk>/', ModuleUpdateAPIView.as_view(), name='module-update'),
     path('module/delete/<int:pk>/', ModuleDestroyAPIView.as_view(), name='module-destroy'),
+    path('module/tree/', ModuleTreeListAPIView.as_view(), name='module-tree-list'),
+    path('module/<int:pk>/tree/', ModuleTreeRetrieveAPIView.as_view(), name='module-tree'),
     path('section/', SectionListAPIView.as_view(), name='section-list'),
     path('section/create/', SectionCreateAPIView.as_view(), name='section-create'),
     path('section/<int:pk>/', SectionRetrieveAPIView.as_view(), name='section-retrieve'),
     path('section/update/<int:pk>/', SectionUpdateAPIView.as_view(), name='section-update'),
     path('section/delete/<int:pk>/', SectionDestroyAPIView.as_view(), name='section-destroy'),
+    path('section/bulk/', SectionBulkAPIView.as_view(), name='section-bulk'),
     path('topic/', TopicListAPIView.as_view(), name='topic-list'),
     path('topic/create/', TopicCreateAPIView.as_view(), name='topic-create'),
     path('topic/<int:pk>/', TopicRetrieveAPIView.as_view(), name='topic-retrieve'),
     path('topic/update/<int:pk>/', TopicUpdateAPIView.as_view(), name='topic-update'),
     path('topic/delete/<int:pk>/', TopicDestroyAPIView.as_view(), name='topic-destroy'),
+    path('topic/bulk/', TopicBulkAPIView.as_view(), name='topic-bulk'),
+    path('topic/<int:pk>/progress/heartbeat/', TopicProgressHeartbeatAPIView.as_view(), name='topic-heartbeat'),
+    path('topic/<int:pk>/complete/', TopicCompleteAPIView.as_view(), name='topic-complete'),
+    path('progress/', ModuleProgressListAPIView.as_view(), name='progress-list'),
+    path('module/<int:module_id>/payment/', PaymentCreateAPIView.as_view(), name='payment-create'),
+    path('payment/<int:pk>/', PaymentStatusAPIView.as_view(), name='payment-status'),
+    path('search/', SearchAPIView.as_view(), name='search'),
+    path('metrics/', MetricsAPIView.as_view(), name='metrics'),
+    path('cache/stats/', ResponseCacheStatsAPIView.as_view(), name='cache-stats'),
+    path('async/module/', async_views.module_list, name='async-module-list'),
+    path('async/module/<int:pk>/', async_views.module_detail, name='async-module-retrieve'),
+    path('async/module/<int:pk>/tree/', async_views.module_tree, name='async-module-tree'),
+    path('async/section/', async_views.section_list, name='async-section-list'),
+    path('async/section/<int:pk>/', async_views.section_detail, name='async-section-retrieve'),
+    path('async/topic/', async_views.topic_list, name='async-topic-list'),
+    path('async/topic/<int:pk>/', async_views.topic_detail, name='async-topic-retrieve'),
 
 ]
@@ -1,17 +1,56 @@
-from rest_framework import generics, permissions
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Count
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import generics, permissions, status
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
-
-from .models import Module, Section, Topic, Payment
-from .serializers import ModuleSerializer, SectionSerializer, TopicSerializer, PaymentSerializer
-
-
-class ModuleListAPIView(generics.ListAPIView):
+from rest_framework.views import APIView
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from .cache import bump_content_versions, response_cache
+from .entitlements import get_paid_module_ids
+from .metrics import metrics_registry
+from .mixins import ValuesListMixin, SummaryListMixin, ConditionalGetMixin, CachedResponseMixin, ContentVersionMixin, \
+    ContentParentPermissionMixin
+from .models import Module, Section, Topic, Payment, PaymentStatus, TopicProgress, change_module_counters
+from .paginators import ContentCursorPagination
+from .parsers import NDJSONParser
+from .permissions import ContentPermission, IsInternalIP
+from .progress import record_heartbeat
+from .renderers import PrometheusRenderer
+from .serializers import ModuleSerializer, SectionSerializer, TopicSerializer, \
+    ModuleTreeSerializer, ModuleSummarySerializer, SectionSummarySerializer, TopicSummarySerializer, \
+    SectionBulkSerializer, TopicBulkSerializer, PaymentStatusSerializer, ModuleSearchSerializer, \
+    SectionSearchSerializer, TopicSearchSerializer, TopicProgressSerializer, ProgressHeartbeatSerializer, \
+    ModuleProgressSerializer
+from .tasks import confirm_payment
+
+# Максимальное количество модулей, которое можно запросить за один раз в дереве курсов
+MODULE_TREE_MAX_IDS = 50
+# Максимальное количество объектов в одном запросе массовой загрузки и размер пакета записи в базу данных
+CONTENT_BULK_MAX_ITEMS = getattr(settings, 'CONTENT_BULK_MAX_ITEMS', 10000)
+CONTENT_BULK_BATCH_SIZE = getattr(settings, 'CONTENT_BULK_BATCH_SIZE', 1000)
+# Минимальная длина поискового запроса и количество результатов поиска каждого типа
+SEARCH_MIN_LENGTH = 2
+SEARCH_RESULTS_LIMIT = getattr(settings, 'SEARCH_RESULTS_LIMIT', 20)
+# Сумма платежа за модуль
+PAYMENT_AMOUNT = getattr(settings, 'MODULE_PAYMENT_AMOUNT', 100)
+
+
+class ModuleListAPIView(ConditionalGetMixin, CachedResponseMixin, ValuesListMixin, SummaryListMixin,
+                        generics.ListAPIView):
     """Класс ModuleListAPIView отвечает за функциональность просмотра при применении
         класса ModuleSerializer, который функционирует в соответствии с определенной моделью класса Module"""
     queryset = Module.objects.all().order_by('id')
     serializer_class = ModuleSerializer
+    summary_serializer_class = ModuleSummarySerializer
+    pagination_class = ContentCursorPagination
 
 
 class ModuleCreateAPIView(generics.CreateAPIView):
@@ -19,21 +58,28 @@ class ModuleCreateAPIView(generics.CreateAPIView):
         класса ModuleSerializer, который функционирует в соответствии с определенной моделью класса Module"""
     queryset = Module.objects.all()
     serializer_class = ModuleSerializer
-    permission_classes = [permissions.IsAdminUser]
+    permission_classes = [ContentPermission]
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        bump_content_versions(serializer.instance.get_content_module_id())
 
 
-class ModuleRetrieveAPIView(generics.RetrieveAPIView):
+class ModuleRetrieveAPIView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
     """Класс ModuleRetrieveAPIView отвечает за функциональность просмотра конкректного модуля при применении
             класса ModuleSerializer, который функционирует в соответствии с определенной моделью класса Module"""
     queryset = Module.objects.all()
     serializer_class = ModuleSerializer
+    module_lookup_url_kwarg = 'pk'
+    cache_per_paid_modules = True
 
     def get_queryset(self):
         return Module.objects.all()
 
+    def get_conditional_queryset(self):
+        # Для неоплаченного модуля ETag не вычисляется, и проверка доступа в get_object вернет 403
+        return super().get_conditional_queryset().filter(id__in=get_paid_module_ids(self.request.user))
+
     def get_object(self):
         module = super().get_object()
         user = self.request.user
@@ -42,128 +88,151 @@ class ModuleRetrieveAPIView(generics.RetrieveAPIView):
         return module
 
 
-class ModuleUpdateAPIView(generics.UpdateAPIView):
+class ModuleUpdateAPIView(ContentVersionMixin, generics.UpdateAPIView):
     """Класс ModuleUpdateAPIView отвечает за функциональность обновления конкректного модуля при применении
             класса ModuleSerializer, который функционирует в соответствии с определенной моделью класса Module"""
     queryset = Module.objects.all()
     serializer_class = ModuleSerializer
-    permission_classes = [permissions.IsAdminUser]
-
-    def get_queryset(self):
-        return Module.objects.filter(user=self.request.user)
+    permission_classes = [ContentPermission]
 
 
-class ModuleDestroyAPIView(generics.DestroyAPIView):
+class ModuleDestroyAPIView(ContentVersionMixin, generics.DestroyAPIView):
     """Класс ModuleDestroyAPIView отвечает за функциональность удаления конкретного объекта при применении
             класса ModuleSerializer, который функционирует в соответствии с определенной моделью класса Module"""
     queryset = Module.objects.all()
     serializer_class = ModuleSerializer
-    permission_classes = [permissions.IsAdminUser]
+    permission_classes = [ContentPermission]
+
+
+class ModuleTreeRetrieveAPIView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
+    """Класс ModuleTreeRetrieveAPIView отвечает за функциональность просмотра модуля вместе с разделами и темами
+            при применении класса ModuleTreeSerializer. Дерево курса загружается тремя запросами
+            независимо от количества разделов и тем"""
+    serializer_class = ModuleTreeSerializer
+    module_lookup_url_kwarg = 'pk'
+    cache_per_paid_modules = True
+    permission_classes = [IsAuthenticated]
+    last_modified_fields = ('updated_at', 'sections__updated_at', 'topics__updated_at')
+    count_fields = ('id', 'sections', 'topics')
 
     def get_queryset(self):
-        return Module.objects.filter(user=self.request.user)
+        return Module.objects.accessible(self.request.user).with_tree()
+
+
+class ModuleTreeListAPIView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    """Класс ModuleTreeListAPIView отвечает за функциональность просмотра нескольких модулей вместе с разделами
+            и темами при применении класса ModuleTreeSerializer. Идентификаторы модулей передаются
+            параметром запроса ids через запятую"""
+    serializer_class = ModuleTreeSerializer
+    cache_per_paid_modules = True
+    permission_classes = [IsAuthenticated]
+    last_modified_fields = ('updated_at', 'sections__updated_at', 'topics__updated_at')
+    count_fields = ('id', 'sections', 'topics')
+
+    def get_module_ids(self):
+        try:
+            module_ids = [int(module_id) for module_id in self.request.query_params.get('ids', '').split(',')]
+        except ValueError:
+            raise ValidationError({'ids': 'Укажите идентификаторы модулей через запятую.'})
+        if len(module_ids) > MODULE_TREE_MAX_IDS:
+            raise ValidationError({'ids': f'Можно запросить не более {MODULE_TREE_MAX_IDS} модулей.'})
+        return module_ids
+
+    def get_queryset(self):
+        return Module.objects.accessible(self.request.user).filter(
+            id__in=self.get_module_ids()).order_by('number', 'id').with_tree()
 
 
 ############################################################################
 
 
-class SectionListAPIView(generics.ListAPIView):
+class SectionListAPIView(ConditionalGetMixin, CachedResponseMixin, ValuesListMixin, SummaryListMixin,
+                         generics.ListAPIView):
     """Класс SectionListAPIView отвечает за функциональность просмотра при применении
         класса SectionSerializer, который функционирует в соответствии с определенной моделью класса Section"""
     serializer_class = SectionSerializer
+    summary_serializer_class = SectionSummarySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ContentCursorPagination
 
     def get_queryset(self):
-        # Получаем список разделов, доступных пользователю
-        user = self.request.user
-        sections = Section.objects.all().order_by('id')
+        # Получаем список разделов оплаченных модулей одним запросом, фильтрация выполняется в базе данных
+        return Section.objects.accessible(self.request.user)
 
-        # Фильтруем только оплаченные разделы
-        paid_sections = [section for section in sections if section.module.is_paid]
 
-        return paid_sections
-
-
-class SectionCreateAPIView(generics.CreateAPIView):
+class SectionCreateAPIView(ContentParentPermissionMixin, generics.CreateAPIView):
     """Класс SectionCreateAPIView отвечает за функциональность создания при применении
         класса SectionSerializer, который функционирует в соответствии с определенной моделью класса Section"""
     queryset = Section.objects.all()
     serializer_class = SectionSerializer
-    permission_classes = [permissions.IsAdminUser]
+    permission_classes = [ContentPermission]
+    parent_field = 'module'
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        super().perform_create(serializer)
+        bump_content_versions(serializer.instance.get_content_module_id())
 
 
-class SectionRetrieveAPIView(generics.RetrieveAPIView):
+class SectionRetrieveAPIView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
     """Класс SectionRetrieveAPIView отвечает за функциональность просмотра конкректного модуля при применении
             класса SectionSerializer, который функционирует в соответствии с определенной моделью класса Section"""
     serializer_class = SectionSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        sections = Section.objects.all()
+        # Поиск по pk и проверка оплаты модуля выполняются одним запросом с JOIN,
+        # для недоступного раздела запрос не вернет строк и будет возвращен ответ 404
+        return Section.objects.accessible(self.request.user)
 
-        # Фильтруем только оплаченные разделы
-        paid_sections = [section for section in sections if section.module.is_paid]
 
-        return paid_sections
-
-
-class SectionUpdateAPIView(generics.UpdateAPIView):
+class SectionUpdateAPIView(ContentVersionMixin, ContentParentPermissionMixin, generics.UpdateAPIView):
     """Класс SectionUpdateAPIView отвечает за функциональность обновления конкректного модуля при применении
             класса SectionSerializer, который функционирует в соответствии с определенной моделью класса Section"""
-    queryset = Section.objects.all()
+    queryset = Section.objects.with_owner()
     serializer_class = SectionSerializer
-    permission_classes = [permissions.IsAdminUser]
-
-    def get_queryset(self):
-        return Section.objects.filter(user=self.request.user)
+    permission_classes = [ContentPermission]
+    parent_field = 'module'
 
 
-class SectionDestroyAPIView(generics.DestroyAPIView):
+class SectionDestroyAPIView(ContentVersionMixin, generics.DestroyAPIView):
     """Класс SectionDestroyAPIView отвечает за функциональность удаления конкретного объекта при применении
             класса SectionSerializer, который функционирует в соответствии с определенной моделью класса Section"""
-    queryset = Section.objects.all()
+    queryset = Section.objects.with_owner()
     serializer_class = SectionSerializer
-    permission_classes = [permissions.IsAdminUser]
-
-    def get_queryset(self):
-        return Section.objects.filter(user=self.request.user)
+    permission_classes = [ContentPermission]
 
 
 ############################################################################
 
 
-class TopicListAPIView(generics.ListAPIView):
+class TopicListAPIView(ConditionalGetMixin, CachedResponseMixin, ValuesListMixin, SummaryListMixin,
+                       generics.ListAPIView):
     """Класс TopicListAPIView отвечает за функциональность просмотра при применении
         класса TopicSerializer, который функционирует в соответствии с определенной моделью класса Topic"""
     serializer_class = TopicSerializer
+    summary_serializer_class = TopicSummarySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ContentCursorPagination
 
     def get_queryset(self):
-        # Получаем список тем, доступных пользователю
-        user = self.request.user
-        topics = Topic.objects.all().order_by('id')
-
-        # Фильтруем только оплаченные темы
-        paid_topics = [topic for topic in topics if topic.section.module.is_paid]
-        return paid_topics
+        # Получаем список тем оплаченных модулей одним запросом, фильтрация выполняется в базе данных
+        return Topic.objects.accessible(self.request.user)
 
 
-class TopicCreateAPIView(generics.CreateAPIView):
+class TopicCreateAPIView(ContentParentPermissionMixin, generics.CreateAPIView):
     """Класс TopicCreateAPIView отвечает за функциональность создания при применении
         класса TopicSerializer, который функционирует в соответствии с определенной моделью класса Topic"""
     queryset = Topic.objects.all()
     serializer_class = TopicSerializer
-    permission_classes = [permissions.IsAdminUser]
+    permission_classes = [ContentPermission]
+    parent_field = 'section'
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        super().perform_create(serializer)
+        bump_content_versions(serializer.instance.get_content_module_id())
 
 
-class TopicRetrieveAPIView(generics.RetrieveAPIView):
+class TopicRetrieveAPIView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
     """Класс TopicRetrieveAPIView отвечает за функциональность просмотра конкректного модуля при применении
             класса TopicSerializer, который функционирует в соответствии с определенной моделью класса Topic"""
     queryset = Topic.objects.all()
@@ -171,45 +240,341 @@ class TopicRetrieveAPIView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        topics = Topic.objects.all()
-
-        # Фильтруем только оплаченные темы
-        paid_topics = [topic for topic in topics if topic.section.module.is_paid]
-
-        return paid_topics
+        # Поиск по pk и проверка оплаты модуля выполняются одним запросом с JOIN,
+        # для недоступной темы запрос не вернет строк и будет возвращен ответ 404
+        return Topic.objects.accessible(self.request.user)
 
 
-class TopicUpdateAPIView(generics.UpdateAPIView):
+class TopicUpdateAPIView(ContentVersionMixin, ContentParentPermissionMixin, generics.UpdateAPIView):
     """Класс TopicUpdateAPIView отвечает за функциональность обновления конкректного модуля при применении
             класса TopicSerializer, который функционирует в соответствии с определенной моделью класса Topic"""
-    queryset = Topic.objects.all()
+    # Раздел нужен при сохранении темы для записи ее модуля, он загружается тем же запросом
+    queryset = Topic.objects.with_owner().select_related('section')
     serializer_class = TopicSerializer
-    permission_classes = [permissions.IsAdminUser]
-
-    def get_queryset(self):
-        return Topic.objects.filter(user=self.request.user)
+    permission_classes = [ContentPermission]
+    parent_field = 'section'
 
 
-class TopicDestroyAPIView(generics.DestroyAPIView):
+class TopicDestroyAPIView(ContentVersionMixin, generics.DestroyAPIView):
     """Класс TopicDestroyAPIView отвечает за функциональность удаления конкретного объекта при применении
             класса TopicSerializer, который функционирует в соответствии с определенной моделью класса Topic"""
-    queryset = Topic.objects.all()
+    queryset = Topic.objects.with_owner()
     serializer_class = TopicSerializer
+    permission_classes = [ContentPermission]
+
+
+class ContentBulkAPIView(ContentParentPermissionMixin, generics.GenericAPIView):
+    """Класс ContentBulkAPIView отвечает за функциональность массового создания (POST), обновления (PATCH)
+            и удаления (DELETE) объектов. Объекты передаются JSON-массивом или в формате NDJSON, проверяются
+            сериализатором за один проход и записываются через bulk_create/bulk_update в одной транзакции.
+            При ошибках проверки ничего не записывается, а ответ содержит ошибки по каждому объекту.
+            Права проверяются для каждого объекта и его родительского объекта, при отказе хотя бы для одного
+            объекта весь пакет отклоняется"""
+    permission_classes = [ContentPermission]
+    parser_classes = [JSONParser, NDJSONParser]
+    # Поле связи с родительским объектом: родительские объекты загружаются одним запросом
+    # только с полями parent_only_fields; module_lookup - путь к идентификатору модуля объекта
+    parent_field = None
+    parent_only_fields = ('id',)
+    module_lookup = None
+    # Поля, которые вычисляются из других полей в prepare_object и записываются при каждом обновлении
+    derived_fields = ()
+    # Счетчик модуля, который изменяется при создании и удалении объектов
+    counter_field = None
+
+    def prepare_object(self, obj):
+        """Заполняет вычисляемые поля объекта перед bulk_create/bulk_update, которые не вызывают save()"""
+
+    def after_bulk_update(self, objects, fields):
+        """Обновляет связанные данные после bulk_update в той же транзакции"""
+
+    def get_deleted_counters(self, queryset):
+        """Возвращает изменения счетчиков модулей при удалении объектов queryset: {поле: Counter}"""
+        return {self.counter_field: Counter(queryset.values_list(self.module_lookup, flat=True))}
+
+    def get_items(self):
+        items = self.request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': 'Ожидается массив объектов.'})
+        if len(items) > CONTENT_BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': f'Можно передать не более {CONTENT_BULK_MAX_ITEMS} объектов.'})
+        if not all(isinstance(item, dict) for item in items):
+            raise ValidationError({'non_field_errors': 'Каждый элемент массива должен быть объектом.'})
+        return items
+
+    def get_related_objects(self, items):
+        parent_field = self.get_queryset().model._meta.get_field(self.parent_field)
+        parent_ids = set()
+        for item in items:
+            try:
+                parent_ids.add(parent_field.target_field.to_python(item.get(self.parent_field)))
+            except (TypeError, ValueError, DjangoValidationError):
+                # Некорректный идентификатор будет отклонен при проверке сериализатором
+                continue
+        parent_ids.discard(None)
+        return self.get_parent_queryset(parent_field.related_model).only(*self.parent_only_fields).in_bulk(parent_ids)
+
+    def get_parent_queryset(self, model):
+        """Возвращает выборку родительских объектов, из которой определяется их владелец"""
+        return model.objects.all()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['related_objects'] = getattr(self, 'related_objects', None)
+        return context
+
+    @staticmethod
+    def error_response(errors):
+        return Response({'errors': [{'index': index, 'errors': item_errors}
+                                    for index, item_errors in enumerate(errors) if item_errors]},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items()
+        self.related_objects = self.get_related_objects(items)
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return self.error_response(serializer.errors)
+
+        for parent in {validated_data.get(self.parent_field) for validated_data in serializer.validated_data}:
+            self.check_object_permissions(request, parent)
+        model = self.get_queryset().model
+        objects = [model(**validated_data) for validated_data in serializer.validated_data]
+        for obj in objects:
+            self.prepare_object(obj)
+        with transaction.atomic():
+            objects = model.objects.bulk_create(objects, batch_size=CONTENT_BULK_BATCH_SIZE)
+            change_module_counters(self.counter_field, Counter(obj.get_content_module_id() for obj in objects))
+            model.objects.filter(pk__in=[obj.pk for obj in objects]).update_search_vector()
+        bump_content_versions(*{obj.get_content_module_id() for obj in objects})
+        return Response(self.get_serializer(objects, many=True).data, status=status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        items = self.get_items()
+        self.related_objects = self.get_related_objects(items)
+        instances = self.get_queryset().in_bulk([item['id'] for item in items if isinstance(item.get('id'), int)])
+
+        errors, updates, module_ids, moved_module_ids = [], [], set(), set()
+        for item in items:
+            instance = instances.get(item.get('id'))
+            if instance is None:
+                errors.append({'id': ['Объект не найден.']})
+                continue
+            self.check_object_permissions(request, instance)
+            serializer = self.get_serializer(instance, data=item, partial=True)
+            if not serializer.is_valid():
+                errors.append(serializer.errors)
+                continue
+            self.check_parent_permissions(serializer)
+            errors.append({})
+            updates.append((instance, serializer.validated_data))
+        if any(errors):
+            return self.error_response(errors)
+
+        now = timezone.now()
+        fields = {'updated_at'}
+        for instance, validated_data in updates:
+            old_module_id = instance.get_content_module_id()
+            for field, value in validated_data.items():
+                setattr(instance, field, value)
+                fields.add(field)
+            instance.updated_at = now
+            self.prepare_object(instance)
+            module_ids.update((old_module_id, instance.get_content_module_id()))
+            if old_module_id != instance.get_content_module_id():
+                moved_module_ids.update((old_module_id, instance.get_content_module_id()))
+        objects = [instance for instance, _ in updates]
+        fields.update(self.derived_fields)
+        with transaction.atomic():
+            self.get_queryset().model.objects.bulk_update(objects, sorted(fields), batch_size=CONTENT_BULK_BATCH_SIZE)
+            self.after_bulk_update(objects, fields)
+            if {'title', 'description'} & fields:
+                self.get_queryset().model.objects.filter(pk__in=[obj.pk for obj in objects]).update_search_vector()
+            if moved_module_ids:
+                # Перенос объектов между модулями случается редко, счетчики затронутых модулей пересчитываются
+                Module.objects.filter(pk__in=moved_module_ids).refresh_counters()
+        bump_content_versions(*module_ids)
+        return Response(self.get_serializer(objects, many=True).data)
+
+    def delete(self, request, *args, **kwargs):
+        ids = request.data
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({'non_field_errors': 'Ожидается массив идентификаторов.'})
+        queryset = self.get_queryset().filter(id__in=ids)
+        for instance in queryset.select_related(None).only('id'):
+            self.check_object_permissions(request, instance)
+        with transaction.atomic():
+            counters = self.get_deleted_counters(queryset)
+            deleted, _ = queryset.delete()
+            for field, deltas in counters.items():
+                change_module_counters(field, {module_id: -delta for module_id, delta in deltas.items()})
+        bump_content_versions(*counters[self.counter_field])
+        return Response({'deleted': deleted})
+
+
+class SectionBulkAPIView(ContentBulkAPIView):
+    """Класс SectionBulkAPIView отвечает за функциональность массового создания, обновления и удаления разделов"""
+    queryset = Section.objects.with_owner()
+    serializer_class = SectionBulkSerializer
+    parent_field = 'module'
+    parent_only_fields = ('id', 'user')
+    module_lookup = 'module_id'
+    counter_field = 'section_count'
+
+    def after_bulk_update(self, objects, fields):
+        # Темы перенесенных разделов получают модуль своего раздела
+        if 'module' in fields:
+            Topic.objects.filter(section__in=objects).sync_module()
+
+    def get_deleted_counters(self, queryset):
+        # Темы удаляемых разделов удаляются каскадно и также уменьшают счетчик тем
+        counters = super().get_deleted_counters(queryset)
+        counters['topic_count'] = Counter(dict(Topic.objects.filter(section__in=queryset).order_by()
+                                               .values('module_id').annotate(total=Count('id'))
+                                               .values_list('module_id', 'total')))
+        return counters
+
+
+class TopicBulkAPIView(ContentBulkAPIView):
+    """Класс TopicBulkAPIView отвечает за функциональность массового создания, обновления и удаления тем"""
+    queryset = Topic.objects.with_owner().select_related('section')
+    serializer_class = TopicBulkSerializer
+    parent_field = 'section'
+    parent_only_fields = ('id', 'module')
+    module_lookup = 'module_id'
+    derived_fields = ('module',)
+    counter_field = 'topic_count'
+
+    def get_parent_queryset(self, model):
+        # Владелец раздела загружается тем же запросом через JOIN
+        return model.objects.with_owner()
+
+    def prepare_object(self, obj):
+        obj.sync_module()
+
+
+class ResponseCacheStatsAPIView(APIView):
+    """Класс ResponseCacheStatsAPIView возвращает счетчики попаданий и промахов кэша ответов текущего процесса"""
     permission_classes = [permissions.IsAdminUser]
 
-    def get_queryset(self):
-        return Topic.objects.filter(user=self.request.user)
+    def get(self, request):
+        return Response(response_cache.get_stats())
+
+
+class MetricsAPIView(APIView):
+    """Класс MetricsAPIView отдает метрики запросов текущего процесса в текстовом формате Prometheus"""
+    permission_classes = [permissions.IsAdminUser | IsInternalIP]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request):
+        return Response(metrics_registry.render())
+
+
+class SearchAPIView(APIView):
+    """Класс SearchAPIView отвечает за функциональность полнотекстового поиска модулей, разделов и тем
+            по названию и описанию. Результаты упорядочены по релевантности, разделы и темы возвращаются
+            только для модулей, доступных пользователю. Параметр type ограничивает поиск одним типом объектов"""
+    permission_classes = [IsAuthenticated]
+
+    def get_querysets(self, user):
+        return {
+            'module': (Module.objects.accessible(user), ModuleSearchSerializer),
+            'section': (Section.objects.accessible(user), SectionSearchSerializer),
+            'topic': (Topic.objects.accessible(user), TopicSearchSerializer),
+        }
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if len(text) < SEARCH_MIN_LENGTH:
+            raise ValidationError({'q': f'Запрос должен содержать не менее {SEARCH_MIN_LENGTH} символов.'})
+        querysets = self.get_querysets(request.user)
+        kind = request.query_params.get('type')
+        if kind is not None:
+            if kind not in querysets:
+                raise ValidationError({'type': f'Допустимые значения: {", ".join(querysets)}.'})
+            querysets = {kind: querysets[kind]}
+        return Response({
+            kind: serializer_class(queryset.search(text)[:SEARCH_RESULTS_LIMIT], many=True).data
+            for kind, (queryset, serializer_class) in querysets.items()
+        })
 
 
 class PaymentCreateAPIView(generics.CreateAPIView):
+    """Класс PaymentCreateAPIView отвечает за функциональность оплаты модуля пользователем. Платеж записывается
+            одним запросом INSERT ... ON CONFLICT DO NOTHING со статусом "ожидает подтверждения", а подтверждение
+            у платежного провайдера выполняется задачей Celery. Повторные запросы с тем же ключом Idempotency-Key
+            или повторная оплата того же модуля не создают новых строк"""
     permission_classes = [IsAuthenticated]  # требуется аутентификация пользователя
-    serializer_class = PaymentSerializer
+    serializer_class = PaymentStatusSerializer
 
     def post(self, request, module_id):
-        module = Module.objects.get(id=module_id)
+        module = get_object_or_404(Module.objects.only('id'), id=module_id)
         user = request.user
-        payment_amount = 100  # Пример суммы платежа
-        payment = Payment(user=user, module=module, amount=payment_amount)
-        payment.save()
-        return Response({'message': 'Payment successful'})
+        idempotency_key = request.headers.get('Idempotency-Key') or None
+        payment = Payment(user=user, module=module, amount=PAYMENT_AMOUNT, idempotency_key=idempotency_key)
+        Payment.objects.bulk_create([payment], ignore_conflicts=True)
+
+        if idempotency_key is not None:
+            # Платеж ищется по ключу: ключ, уже использованный для оплаты другого модуля, отклоняется
+            payment = Payment.objects.filter(user=user, idempotency_key=idempotency_key).first()
+            if payment is not None and payment.module_id != module.id:
+                return Response({'detail': 'Ключ Idempotency-Key уже использован для оплаты другого модуля.'},
+                                status=status.HTTP_409_CONFLICT)
+        if idempotency_key is None or payment is None:
+            # Модуль уже оплачивался без ключа или с другим ключом
+            payment = Payment.objects.get(user=user, module=module)
+        if payment.status == PaymentStatus.FAILED:
+            # Отклоненный платеж можно повторить: он снова отправляется на подтверждение
+            Payment.objects.filter(id=payment.id, status=PaymentStatus.FAILED).update(status=PaymentStatus.PENDING)
+            payment.status = PaymentStatus.PENDING
+        if payment.status == PaymentStatus.PENDING:
+            transaction.on_commit(lambda: confirm_payment.delay(payment.id))
+        return Response(self.get_serializer(payment).data, status=status.HTTP_202_ACCEPTED)
+
+
+class PaymentStatusAPIView(generics.RetrieveAPIView):
+    """Класс PaymentStatusAPIView отвечает за функциональность просмотра статуса платежа пользователя"""
+    serializer_class = PaymentStatusSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Payment.objects.filter(user=self.request.user)
+
+
+class TopicProgressHeartbeatAPIView(generics.GenericAPIView):
+    """Класс TopicProgressHeartbeatAPIView принимает частые отметки просмотра темы. Отметка накапливается
+    в кэше и записывается в базу данных периодической задачей, поэтому запрос не обращается к базе данных;
+    доступ к теме проверяется при записи"""
+    serializer_class = ProgressHeartbeatSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        record_heartbeat(request.user.id, pk, serializer.validated_data['position'],
+                         serializer.validated_data['seconds'])
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class TopicCompleteAPIView(generics.GenericAPIView):
+    """Класс TopicCompleteAPIView отмечает тему завершенной. Отметка записывается в базу данных сразу,
+    для тем модулей, открытых для всех или оплаченных пользователем"""
+    serializer_class = TopicProgressSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        topic = get_object_or_404(Topic.objects.accessible(request.user).select_related(None).only('id'), pk=pk)
+        progress = TopicProgress.objects.complete(request.user, topic)
+        return Response(self.get_serializer(progress).data)
+
+
+class ModuleProgressListAPIView(generics.ListAPIView):
+    """Класс ModuleProgressListAPIView отвечает за функциональность просмотра процента прохождения модулей,
+    начатых пользователем. Данные считаются одним запросом с группировкой по модулю"""
+    serializer_class = ModuleProgressSerializer
+    permission_classes = [IsAuthenticated]
+    # Количество модулей, начатых пользователем, невелико, поэтому список не разбивается на страницы
+    pagination_class = None
+
+    def get_queryset(self):
+        return TopicProgress.objects.filter(user=self.request.user).completion_by_module()
@@ -1,3 +1,19 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-# Register your models here.
+from main.paginators import EstimatedCountPaginator
+from users.models import User
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    """Класс UserAdmin для отображения и поиска модели User, используется также для выбора
+    пользователя в полях с автодополнением. Поиск выполняется по началу имени пользователя и почты"""
+    list_display = ('username', 'email', 'roles', 'is_staff', 'is_active')
+    list_filter = ('roles', 'is_staff', 'is_active')
+    search_fields = ('^username', '^email')
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ('Профиль', {'fields': ('phone', 'country', 'avatar', 'roles')}),
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
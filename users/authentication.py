@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import ClaimsUser, User
+
+# Время жизни полей пользователя в общем кэше, в секундах
+USER_CACHE_TTL = getattr(settings, 'USER_CACHE_TTL', 60)
+
+# Поля пользователя, которые записываются в токен и используются для проверки доступа
+CLAIM_FIELDS = ('username', 'roles', 'is_staff', 'is_superuser', 'is_active')
+AUTH_VERSION_CLAIM = 'auth_version'
+# Поле password не кэшируется: оно не нужно для обработки запросов
+CACHED_FIELDS = tuple(field.attname for field in User._meta.concrete_fields if field.attname != 'password')
+
+
+def _user_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def _auth_version_key(user_id):
+    return f'users:auth_version:{user_id}'
+
+
+def get_auth_version(user_id):
+    """Возвращает версию прав пользователя. Начальная версия уникальна во времени: если ключ будет
+    вытеснен из кэша, токены с прежней версией не совпадут с новой и будут проверены по базе данных"""
+    version = cache.get(_auth_version_key(user_id))
+    if version is None:
+        cache.add(_auth_version_key(user_id), time.time_ns(), None)
+        version = cache.get(_auth_version_key(user_id))
+    return version
+
+
+def get_cached_user_values(user_id):
+    """Возвращает словарь полей пользователя из общего кэша, при промахе загружает его одним запросом"""
+    values = cache.get(_user_key(user_id))
+    if values is None:
+        values = User.objects.filter(pk=user_id).values(*CACHED_FIELDS).first()
+        if values is None:
+            return None
+        cache.set(_user_key(user_id), values, USER_CACHE_TTL)
+    return values
+
+
+def invalidate_user(user_id, revoke_claims=True):
+    """Сбрасывает закэшированные поля пользователя. При revoke_claims утверждения ранее выданных токенов
+    перестают считаться актуальными и права пользователя берутся из кэша или базы данных"""
+    cache.delete(_user_key(user_id))
+    if revoke_claims:
+        cache.set(_auth_version_key(user_id), time.time_ns(), None)
+
+
+def get_token_claims(user):
+    """Возвращает утверждения о пользователе, которые добавляются в токен при его выдаче"""
+    claims = {field: getattr(user, field) for field in CLAIM_FIELDS}
+    claims[AUTH_VERSION_CLAIM] = get_auth_version(user.pk)
+    return claims
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Класс CachedJWTAuthentication строит пользователя по подписанным утверждениям токена без запроса
+    к базе данных. Утверждения используются, пока версия прав пользователя в кэше совпадает с версией
+    в токене; после деактивации или изменения роли пользователь берется из кэша полей пользователя"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        claims = {field: validated_token.get(field) for field in CLAIM_FIELDS}
+        token_version = validated_token.get(AUTH_VERSION_CLAIM)
+        if None in claims.values() or token_version is None or token_version != get_auth_version(user_id):
+            claims = get_cached_user_values(user_id)
+            if claims is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if not claims['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        # Экземпляр строится по именам полей: from_db сопоставляет неполный список значений с полями модели
+        # по порядку их объявления, а не по порядку утверждений
+        user = ClaimsUser(id=user_id, **{field: claims[field] for field in CLAIM_FIELDS})
+        user._state.adding = False
+        user._state.db = router.db_for_read(User)
+        # Остальные поля считаются отложенными и загружаются из кэша при первом обращении
+        for attname in CACHED_FIELDS + ('password',):
+            if attname != 'id' and attname not in CLAIM_FIELDS:
+                user.__dict__.pop(attname, None)
+        return user
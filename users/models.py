@@ -27,3 +27,21 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'пользователь'
         verbose_name_plural = 'пользователи'
+
+
+class ClaimsUser(User):
+    """Пользователь, построенный по подписанным утверждениям JWT без запроса к базе данных.
+    Поля, которых нет в токене, при первом обращении загружаются из кэша пользователя"""
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        from users.authentication import get_cached_user_values
+
+        values = get_cached_user_values(self.pk) if fields is not None else None
+        if values is None or not set(fields) <= values.keys():
+            return super().refresh_from_db(using=using, fields=fields, **kwargs)
+        for attname, value in values.items():
+            if attname not in self.__dict__:
+                setattr(self, attname, value)
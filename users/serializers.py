@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from users.authentication import get_token_claims
 from users.models import User
 
 
@@ -11,4 +13,16 @@ class UserSerializers(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Класс UserTokenObtainPairSerializer добавляет в токены роль, признаки администратора и активности
+    пользователя и версию его прав, чтобы аутентификация не запрашивала пользователя из базы данных"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in get_token_claims(user).items():
+            token[claim] = value
+        return token
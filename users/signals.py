@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.authentication import CLAIM_FIELDS, invalidate_user
+from users.models import User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Утверждения токенов отзываются, только если могли измениться поля, влияющие на доступ
+    if created:
+        return
+    revoke_claims = update_fields is None or bool(set(update_fields) & set(CLAIM_FIELDS))
+    invalidate_user(instance.pk, revoke_claims=revoke_claims)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
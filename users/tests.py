@@ -1,3 +1,91 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from main.models import Module
+from main.views import ModuleUpdateAPIView
+from users.authentication import CachedJWTAuthentication
+from users.models import ClaimsUser, User, UserRoles
+from users.serializers import UserTokenObtainPairSerializer
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    """Класс CachedJWTAuthenticationTest проверяет, что пользователь строится по утверждениям токена
+    без запросов к базе данных, а изменение роли и деактивация пользователя учитываются сразу,
+    без ожидания истечения токена"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='testuser', email='testuser@example.com')
+        self.authentication = CachedJWTAuthentication()
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.authentication.authenticate(request)[0]
+
+    def get_token(self):
+        return str(UserTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def test_claims_without_queries(self):
+        token = self.get_token()
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.username, 'testuser')
+        self.assertEqual(user.roles, UserRoles.MEMBER)
+        self.assertFalse(user.is_staff)
+
+    def test_deferred_fields_from_cache(self):
+        user = self.authenticate(self.get_token())
+        self.assertEqual(user.email, 'testuser@example.com')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(self.get_token()).email, 'testuser@example.com')
+
+    def test_role_change_revokes_claims(self):
+        token = self.get_token()
+        self.user.roles = UserRoles.MODERATOR
+        self.user.save(update_fields=['roles'])
+        self.assertEqual(self.authenticate(token).roles, UserRoles.MODERATOR)
+
+    def test_unrelated_update_keeps_claims(self):
+        token = self.get_token()
+        self.user.country = 'Москва'
+        self.user.save(update_fields=['country'])
+        with self.assertNumQueries(0):
+            self.authenticate(token)
+
+    def test_inactive_user_rejected(self):
+        token = self.get_token()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_deleted_user_rejected(self):
+        token = self.get_token()
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_token_without_claims(self):
+        user = self.authenticate(str(AccessToken.for_user(self.user)))
+        self.assertEqual(user.username, 'testuser')
+
+    def test_claim_fields_match_user(self):
+        user = self.authenticate(self.get_token())
+        self.assertEqual((user.username, user.roles, user.is_staff, user.is_superuser, user.is_active),
+                         ('testuser', UserRoles.MEMBER, False, False, True))
+
+    def test_member_claims_forbidden_on_write_view(self):
+        owner = User.objects.create_superuser(username='admin', email='admin@example.com', password=None)
+        module = Module.objects.create(user=owner, number=1, title='Module 1', description='Module description')
+        request = APIRequestFactory().patch(f'/module/update/{module.id}/', {'title': 'Updated'}, format='json')
+        force_authenticate(request, user=self.authenticate(self.get_token()))
+        response = ModuleUpdateAPIView.as_view()(request, pk=module.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        module.refresh_from_db()
+        self.assertEqual(module.title, 'Module 1')
@@ -6,10 +6,12 @@ from rest_framework_simplejwt.views import (
 )
 
 from users.apps import UsersConfig
+from users.serializers import UserTokenObtainPairSerializer
 
 app_name = UsersConfig.name
 
 urlpatterns = [
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/', TokenObtainPairView.as_view(serializer_class=UserTokenObtainPairSerializer),
+         name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]